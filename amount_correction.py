@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# 금액 보정 엔진 (해시 조인)
+# --------------------------------------------------------------------------
+# 쇼핑몰 가격표(marketplaces.ADAPTERS)의 키(재고관리코드, 수령자명, 주문수량)를 한 번만 정리해 정수 코드로 바꾸고,
+# 가격표마다 코드 → 행 위치 해시 인덱스를 만들어 둡니다. 주문 행은 같은 사전으로 코드만 구해
+# get_indexer로 조회하므로, 문자열 키로 merge하면서 표 전체를 복사하지 않습니다.
+# 가격표에 같은 키가 여러 번 있으면 처음 나온 행의 금액을 씁니다 (기존 drop_duplicates(keep='first')와 같음).
+
+
+def normalize_text_key(values):
+    return values.astype(str).str.strip()
+
+
+def normalize_quantity(values):
+    return pd.to_numeric(values, errors='coerce').fillna(0).astype(int)
+
+
+def _positions(categories, values):
+    """중복 없는 categories 안에서 values의 위치(없으면 -1).
+
+    문자열 열은 Index.get_indexer가 매번 파이썬 객체 배열로 바꾸므로, 이어 붙여 factorize 한 번으로 구합니다.
+    categories가 앞에 있으므로 categories의 코드는 0..n-1 그대로이고, n 이상은 새 값입니다.
+    """
+    codes, _ = pd.factorize(pd.concat([categories, values], ignore_index=True), use_na_sentinel=False)
+    codes = codes[len(categories):]
+    return np.where(codes < len(categories), codes, -1)
+
+
+class _KeyCodec:
+    """가격표 키 값으로 만든 공통 사전. 가격표에 없는 값은 -1(조회 실패)로 부호화합니다.
+
+    codes에는 사전을 만든 가격표 행들의 키 코드가 들어 있습니다.
+    """
+
+    def __init__(self, skus, recipients, quantities):
+        sku_codes, self.skus = pd.factorize(skus, use_na_sentinel=False)
+        recipient_codes, self.recipients = pd.factorize(recipients, use_na_sentinel=False)
+        self.skus, self.recipients = pd.Series(self.skus), pd.Series(self.recipients)
+        # 재고관리코드 × 수령자명 조합은 가격표에 실제로 있는 것만 번호를 매겨 코드가 커지지 않게 합니다
+        pair_codes, pairs = pd.factorize(sku_codes.astype(np.int64) * len(self.recipients) + recipient_codes)
+        quantity_codes, quantities = pd.factorize(quantities)
+        self.pairs, self.quantities = pd.Index(pairs), pd.Index(quantities)
+        self.codes = pair_codes.astype(np.int64) * len(self.quantities) + quantity_codes
+
+    def encode(self, skus, recipients, quantities):
+        """정리된 키 열을 하나의 int64 코드 배열로 바꿉니다."""
+        sku_codes = _positions(self.skus, skus)
+        recipient_codes = _positions(self.recipients, recipients)
+        pair_values = np.where(
+            (sku_codes >= 0) & (recipient_codes >= 0), sku_codes.astype(np.int64) * len(self.recipients) + recipient_codes, -1
+        )
+        pair_codes = self.pairs.get_indexer(pair_values)
+        quantity_codes = self.quantities.get_indexer(quantities)
+        found = (pair_codes >= 0) & (quantity_codes >= 0)
+        return np.where(found, pair_codes.astype(np.int64) * len(self.quantities) + quantity_codes, -1)
+
+
+class _PriceIndex:
+    """키 코드 → 금액 조회표. 중복 키는 처음 행만 남깁니다."""
+
+    def __init__(self, codes, prices):
+        first = ~pd.Index(codes).duplicated(keep='first')
+        self._index = pd.Index(codes[first])
+        self._prices = prices.to_numpy()[first]
+
+    def lookup(self, codes):
+        """codes와 같은 길이의 금액 배열. 없는 키는 NaN입니다."""
+        return pd.api.extensions.take(self._prices, self._index.get_indexer(codes), allow_fill=True)
+
+
+class AmountCorrector:
+    """쇼핑몰 가격표 금액으로 이카운트 주문 행의 실결제금액을 보정합니다.
+
+    price_tables는 (MallAdapter, adapter.prepare를 거친 데이터프레임) 목록이며 개수 제한은 없습니다.
+    가격표 인덱스는 한 번 만들어 여러 주문 행 묶음(증분 처리의 새 행 등)에 다시 쓸 수 있습니다.
+    """
+
+    def __init__(self, price_tables):
+        self._adapters = [adapter for adapter, _ in price_tables]
+        keys = [adapter.price_keys(df) for adapter, df in price_tables]
+        keys = [(normalize_text_key(sku), normalize_text_key(recipient), normalize_quantity(quantity)) for sku, recipient, quantity in keys]
+        # 모든 가격표의 키를 이어 붙여 한 번에 부호화한 뒤, 가격표별로 나눠 인덱스를 만듭니다
+        self._codec = _KeyCodec(*(pd.concat(columns, ignore_index=True) for columns in zip(*keys)))
+        bounds = np.cumsum([0] + [len(df) for _, df in price_tables])
+        self._prices = [
+            _PriceIndex(self._codec.codes[start:end], df[adapter.correction_column])
+            for (adapter, df), start, end in zip(price_tables, bounds[:-1], bounds[1:])
+        ]
+
+    def lookup(self, df_lines):
+        """주문 행마다 가격표별 보정 금액 {보정 금액 열: 금액 배열}. 가격표에 없는 키는 NaN입니다."""
+        codes = self._codec.encode(df_lines['재고관리코드'], df_lines['수령자명'], df_lines['주문수량'])
+        return {adapter.correction_column: price_index.lookup(codes) for adapter, price_index in zip(self._adapters, self._prices)}
+
+    def correct(self, df_lines):
+        """df_lines(prepare_order_lines 결과)에 보정 금액 열을 붙이고 실결제금액을 제자리에서 고칩니다.
+
+        각 쇼핑몰(adapter.mall)의 주문 행만, 그 가격표에 같은 키가 있을 때 그 금액으로 바꿉니다.
+        """
+        amounts = df_lines['실결제금액'].to_numpy(dtype=float, copy=True)
+        for adapter, (column, prices) in zip(self._adapters, self.lookup(df_lines).items()):
+            df_lines[column] = prices
+            update = (df_lines['쇼핑몰'] == adapter.mall).to_numpy(dtype=bool) & df_lines[column].notna().to_numpy()
+            amounts[update] = df_lines[column].to_numpy(dtype=float)[update]
+        df_lines['실결제금액'] = amounts
+        return df_lines
@@ -0,0 +1,131 @@
+"""금액 보정 벤치마크: 기존 문자열 키 merge 두 번과 해시 조인 엔진(AmountCorrector)을 비교합니다.
+
+사용법:
+    python benchmarks/bench_amount_correction.py --rows 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amount_correction import AmountCorrector  # noqa: E402
+from marketplaces import ADAPTERS  # noqa: E402
+
+
+def legacy_correct_amounts(df_lines, df_smartstore, df_godomall):
+    """비교 기준: 해시 조인 엔진 도입 전의 correct_amounts 구현 그대로입니다."""
+    key_cols_smartstore = ['재고관리코드', '주문수량', '수령자명']
+    smartstore_prices = df_smartstore.rename(columns={'실결제금액': '수정될_금액_스토어'})[key_cols_smartstore + ['수정될_금액_스토어']].drop_duplicates(subset=key_cols_smartstore, keep='first')
+
+    key_cols_godomall = ['재고관리코드', '수취인 이름', '상품수량']
+    godomall_prices_for_merge = df_godomall[key_cols_godomall + ['수정될_금액_고도몰']].rename(
+        columns={'수취인 이름': '수령자명', '상품수량': '주문수량'}
+    )
+    godomall_prices_for_merge = godomall_prices_for_merge.drop_duplicates(
+        subset=['재고관리코드', '수령자명', '주문수량'], keep='first'
+    )
+
+    for col in ['재고관리코드', '수령자명']:
+        smartstore_prices[col] = smartstore_prices[col].astype(str).str.strip()
+        godomall_prices_for_merge[col] = godomall_prices_for_merge[col].astype(str).str.strip()
+
+    for col in ['주문수량']:
+        smartstore_prices[col] = pd.to_numeric(smartstore_prices[col], errors='coerce').fillna(0).astype(int)
+        godomall_prices_for_merge[col] = pd.to_numeric(godomall_prices_for_merge[col], errors='coerce').fillna(0).astype(int)
+
+    df_final = pd.merge(df_lines, smartstore_prices, on=key_cols_smartstore, how='left')
+    df_final = pd.merge(df_final, godomall_prices_for_merge,
+                        on=['재고관리코드', '수령자명', '주문수량'],
+                        how='left')
+
+    df_final['실결제금액'] = np.where(df_final['쇼핑몰'] == '고도몰5', df_final['수정될_금액_고도몰'].fillna(df_final['실결제금액']), df_final['실결제금액'])
+    df_final['실결제금액'] = np.where(df_final['쇼핑몰'] == '스마트스토어', df_final['수정될_금액_스토어'].fillna(df_final['실결제금액']), df_final['실결제금액'])
+    return df_final
+
+
+def engine_correct_amounts(df_lines, df_smartstore, df_godomall):
+    # 합성 고도몰 표에는 보정 금액이 이미 있으므로 스마트스토어만 어댑터 전처리를 거칩니다
+    df_smartstore = ADAPTERS['smartstore'].prepare(df_smartstore.copy())
+    return AmountCorrector([(ADAPTERS['smartstore'], df_smartstore), (ADAPTERS['godomall'], df_godomall)]).correct(df_lines)
+
+
+# --------------------------------------------------------------------------
+# 합성 데이터
+# --------------------------------------------------------------------------
+
+def make_frames(n_rows, seed=0):
+    """이카운트 주문 행(prepare_order_lines 이후 모양)과 스마트스토어, 고도몰 가격표를 만듭니다.
+
+    가격표 키는 앞뒤 공백과 중복 행이 섞여 있고, 주문 행의 약 10%는 가격표에 없습니다.
+    """
+    rng = np.random.default_rng(seed)
+    skus = np.array([f"G{i:03d}E" for i in range(2000)])
+    malls = np.array(['고도몰5', '스마트스토어', '쿠팡', '배민상회', '이지웰몰'])
+    recipients = np.array([f"수령자{i}" for i in range(max(n_rows // 3, 1))])
+
+    df_lines = pd.DataFrame({
+        '재고관리코드': skus[rng.integers(0, len(skus), n_rows)],
+        'SKU상품명': '고래미 상품',
+        '주문수량': rng.integers(1, 5, n_rows),
+        '실결제금액': rng.integers(1000, 100000, n_rows),
+        '쇼핑몰': malls[rng.integers(0, len(malls), n_rows)],
+        '수령자명': np.sort(recipients[rng.integers(0, len(recipients), n_rows)]),
+    })
+    df_lines['original_order'] = range(n_rows)
+
+    def price_table(mall):
+        rows = df_lines[df_lines['쇼핑몰'] == mall]
+        rows = rows[rng.random(len(rows)) > 0.1]
+        rows = pd.concat([rows, rows.sample(frac=0.05, random_state=seed)]).sort_index(kind='stable')
+        return (
+            ' ' + rows['재고관리코드'] + ' ', rows['수령자명'] + ' ',
+            rows['주문수량'].astype(str), rows['실결제금액'] - rng.integers(0, 3000, len(rows)),
+        )
+
+    sku, recipient, qty, amount = price_table('스마트스토어')
+    df_smartstore = pd.DataFrame({'재고관리코드': sku, '주문수량': qty, '수령자명': recipient, '실결제금액': amount})
+    sku, recipient, qty, amount = price_table('고도몰5')
+    df_godomall = pd.DataFrame({'재고관리코드': sku, '수취인 이름': recipient, '상품수량': qty, '수정될_금액_고도몰': amount.astype(float)})
+    return df_lines, df_smartstore, df_godomall
+
+
+def measure(func, frames, trace_memory=False):
+    """실행 시간(초)과 tracemalloc 최대 메모리(MB)를 잽니다. 주문 행은 매번 복사본을 넘깁니다."""
+    df_lines, df_smartstore, df_godomall = frames
+    started = time.perf_counter()
+    result = func(df_lines.copy(), df_smartstore, df_godomall)
+    elapsed = time.perf_counter() - started
+    if not trace_memory:
+        return result, elapsed, float('nan')
+    df_copy = df_lines.copy()
+    tracemalloc.start()
+    func(df_copy, df_smartstore, df_godomall)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--memory', action='store_true', help='tracemalloc으로 최대 메모리도 측정합니다')
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'legacy(s)':>10} {'legacy(MB)':>11} {'engine(s)':>10} {'engine(MB)':>11} {'speedup':>8}")
+    for n_rows in args.rows:
+        frames = make_frames(n_rows)
+        legacy, legacy_time, legacy_mem = measure(legacy_correct_amounts, frames, args.memory)
+        engine, engine_time, engine_mem = measure(engine_correct_amounts, frames, args.memory)
+        # 두 방식의 결과가 같아야 비교에 의미가 있습니다
+        pd.testing.assert_frame_equal(engine[legacy.columns], legacy)
+        print(f"{n_rows:>8} {legacy_time:>10.2f} {legacy_mem:>11.1f} {engine_time:>10.2f} {engine_mem:>11.1f} {legacy_time / engine_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""to_excel_formatted 벤치마크: 기존 load-and-reformat 방식과 스트리밍 엔진을 비교합니다.
+
+사용법:
+    python benchmarks/bench_excel_export.py --rows 10000 100000 500000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.styles import PatternFill, Border, Side, Alignment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_export import to_excel_formatted  # noqa: E402
+
+
+def legacy_to_excel_formatted(df, format_type=None):
+    """비교 기준: 스트리밍 엔진 도입 전의 to_excel_formatted 구현 그대로입니다."""
+    output = io.BytesIO()
+    df_to_save = df.fillna('')
+
+    if format_type == 'ecount_upload':
+        df_to_save = df_to_save.rename(columns={'적요_전표': '적요', '적요_품목': '적요.1'})
+
+    df_to_save.to_excel(output, index=False, sheet_name='Sheet1')
+
+    workbook = openpyxl.load_workbook(output)
+    sheet = workbook.active
+
+    center_alignment = Alignment(horizontal='center', vertical='center')
+    for row in sheet.iter_rows():
+        for cell in row:
+            cell.alignment = center_alignment
+
+    for column_cells in sheet.columns:
+        max_length = 0
+        column = column_cells[0].column_letter
+        for cell in column_cells:
+            try:
+                if cell.value:
+                    if len(str(cell.value)) > max_length:
+                        max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = (max_length + 2) * 1.2
+        sheet.column_dimensions[column].width = adjusted_width
+
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    pink_fill = PatternFill(start_color="FFEBEE", end_color="FFEBEE", fill_type="solid")
+
+    if format_type == 'packing_list':
+        for row in sheet.iter_rows(min_row=1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
+            for cell in row:
+                cell.border = thin_border
+
+        bundle_start_row = 2
+        for row_num in range(2, sheet.max_row + 2):
+            current_bundle_cell = sheet.cell(row=row_num, column=1) if row_num <= sheet.max_row else None
+
+            if (current_bundle_cell and current_bundle_cell.value) or (row_num > sheet.max_row):
+                if row_num > 2:
+                    bundle_end_row = row_num - 1
+                    prev_bundle_num_str = str(sheet.cell(row=bundle_start_row, column=1).value)
+
+                    if prev_bundle_num_str.isdigit():
+                        prev_bundle_num = int(prev_bundle_num_str)
+                        if prev_bundle_num % 2 != 0:
+                            for r in range(bundle_start_row, bundle_end_row + 1):
+                                for c in range(1, sheet.max_column + 1):
+                                    sheet.cell(row=r, column=c).fill = pink_fill
+
+                    if bundle_start_row < bundle_end_row:
+                        sheet.merge_cells(start_row=bundle_start_row, start_column=1, end_row=bundle_end_row, end_column=1)
+                        sheet.merge_cells(start_row=bundle_start_row, start_column=4, end_row=bundle_end_row, end_column=4)
+
+                bundle_start_row = row_num
+
+    if format_type == 'quantity_summary':
+        for row_idx, row in enumerate(sheet.iter_rows(min_row=1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column)):
+            for cell in row:
+                cell.border = thin_border
+            if row_idx > 0 and row_idx % 2 != 0:
+                for cell in row:
+                    cell.fill = pink_fill
+
+    final_output = io.BytesIO()
+    workbook.save(final_output)
+    final_output.seek(0)
+
+    return final_output.getvalue()
+
+
+# --------------------------------------------------------------------------
+# 합성 데이터
+# --------------------------------------------------------------------------
+
+def make_frames(n_rows, seed=0):
+    """format_type별로 n_rows 행짜리 합성 데이터프레임을 만듭니다."""
+    rng = np.random.default_rng(seed)
+    skus = [f"G{i:03d}E" for i in range(300)]
+    names = [f"[BOX] 고래미 상품 {i}" for i in range(300)]
+    malls = np.array(['고도몰5', '스마트스토어', '쿠팡', '배민상회', '이지웰몰'])
+    sku_idx = rng.integers(0, len(skus), n_rows)
+    qty = rng.integers(1, 5, n_rows)
+    amount = rng.integers(1000, 100000, n_rows)
+    recipients = np.array([f"수령자{i}" for i in range(max(n_rows // 3, 1))])[np.sort(rng.integers(0, max(n_rows // 3, 1), n_rows))]
+    mall = malls[rng.integers(0, len(malls), n_rows)]
+
+    is_first_item = pd.Series(recipients) != pd.Series(recipients).shift(1)
+    bundle = is_first_item.cumsum().where(is_first_item, '')
+    df_pack = pd.DataFrame({
+        '묶음번호': bundle, 'SKU상품명': np.array(names)[sku_idx], '주문수량': qty,
+        '수령자명': recipients, '쇼핑몰': mall,
+    })
+
+    df_qty = pd.DataFrame({'SKU상품명': names, '개수': rng.integers(1, 500, len(names))})
+    df_qty = pd.concat([df_qty] * max(n_rows // len(names), 1), ignore_index=True).head(n_rows)
+
+    supply = (amount / 1.1).round().astype('int64')
+    df_ecount = pd.DataFrame({
+        '일자': '20261018', '순번': '', '거래처코드': '', '거래처명': mall, '담당자': '', '출하창고': '고래미',
+        '거래유형': 11, '통화': '', '환율': '', '적요_전표': '오전/온라인', '미수금': '', '총합계': '', '연결전표': '',
+        '품목코드': np.array(skus)[sku_idx], '품목명': '', '규격': '', '박스': np.where(qty > 2, qty, np.nan),
+        '수량': qty, '단가': '', '외화금액': '', '공급가액': supply, '부가세': amount - supply, '적요_품목': '',
+        '생산전표생성': '', '시리얼/로트': '', '관리항목': '', '쇼핑몰고객명': recipients,
+    })
+    return {'ecount_upload': df_ecount, 'packing_list': df_pack, 'quantity_summary': df_qty}
+
+
+def measure(func, df, format_type, trace_memory=False):
+    """실행 시간(초)과 tracemalloc 최대 메모리(MB)를 잽니다. tracemalloc은 매우 느려 시간 측정과 분리합니다."""
+    started = time.perf_counter()
+    func(df, format_type=format_type)
+    elapsed = time.perf_counter() - started
+    if not trace_memory:
+        return elapsed, float('nan')
+    tracemalloc.start()
+    func(df, format_type=format_type)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--legacy-max-rows', type=int, default=500000,
+                        help='이 행 수를 넘으면 기존 방식 측정을 건너뜁니다 (기존 방식은 매우 느립니다)')
+    parser.add_argument('--memory', action='store_true', help='tracemalloc으로 최대 메모리도 측정합니다')
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'format_type':<17} {'legacy(s)':>10} {'legacy(MB)':>11} {'stream(s)':>10} {'stream(MB)':>11} {'speedup':>8}")
+    for n_rows in args.rows:
+        for format_type, df in make_frames(n_rows).items():
+            stream_time, stream_mem = measure(to_excel_formatted, df, format_type, args.memory)
+            if n_rows <= args.legacy_max_rows:
+                legacy_time, legacy_mem = measure(legacy_to_excel_formatted, df, format_type, args.memory)
+                print(f"{n_rows:>8} {format_type:<17} {legacy_time:>10.2f} {legacy_mem:>11.1f} {stream_time:>10.2f} {stream_mem:>11.1f} {legacy_time / stream_time:>7.1f}x")
+            else:
+                print(f"{n_rows:>8} {format_type:<17} {'-':>10} {'-':>11} {stream_time:>10.2f} {stream_mem:>11.1f} {'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""증분 처리 벤치마크: 하루 두 번 실행(오전 일부 파일 → 오후 전체 파일)한 결과가 전체 처리와 같은지 확인하고 시간을 잽니다.
+
+첫 실행은 이카운트 주문의 앞쪽 절반과 스마트스토어 파일의 앞쪽 절반만으로 처리해 상태 저장소를 채웁니다.
+두 번째 실행은 전체 파일로 증분 처리하며, 그 사이 금액이 바뀐 가격표 행도 섞어 둡니다.
+두 번째 실행 결과가 같은 파일을 상태 저장소 없이 처리한 결과와 하나라도 다르면 종료 코드 1로 끝납니다.
+
+사용법:
+    python benchmarks/bench_incremental.py --rows 10000 100000
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from master_store import get_master_store  # noqa: E402
+from order_state import OrderStateStore  # noqa: E402
+from refine_pipeline import process_all_files  # noqa: E402
+from synthetic_orders import ROOT_DIR, generate_orders  # noqa: E402
+from upload_cache import UPLOAD_CACHE_DIR_ENV  # noqa: E402
+
+# process_all_files 결과 위치 → 이름 (비교 대상)
+RESULTS = {0: '최종 보정 리스트', 1: '출고수량 요약', 2: '포장 리스트', 3: '이카운트 업로드', 4: '결제 금액 불일치', 7: '확인 필요 항목'}
+
+
+def _csv_file(df):
+    return io.BytesIO(df.to_csv(index=False).encode('utf-8-sig'))
+
+
+def run(frames, master, state_store=None):
+    """슬롯별 데이터프레임을 CSV 파일로 처리해 (결과, 초)를 돌려줍니다."""
+    started = time.perf_counter()
+    result = process_all_files(
+        _csv_file(frames['smartstore']), _csv_file(frames['ecount']), _csv_file(frames['godomall']),
+        master, parallel_read=False, state_store=state_store, business_date='20240101',
+    )
+    if not result[5]:
+        raise RuntimeError(result[6])
+    return result, time.perf_counter() - started
+
+
+def morning_files(frames):
+    """오전 파일: 이카운트 주문 앞쪽 절반, 스마트스토어 파일 앞쪽 절반 (금액은 오후 파일과 일부 다름)."""
+    df_smartstore = frames['smartstore'].iloc[:len(frames['smartstore']) // 2].copy()
+    df_smartstore.loc[df_smartstore.index[::7], '실결제금액'] += 100
+    return {
+        'smartstore': df_smartstore,
+        'ecount': frames['ecount'].iloc[:len(frames['ecount']) // 2],
+        'godomall': frames['godomall'],
+    }
+
+
+def compare(incremental, full):
+    """결과별로 다른 값이 있는 행 수 {이름: 행 수}. 모두 같으면 빈 dict."""
+    differences = {}
+    for position, name in RESULTS.items():
+        left, right = incremental[position].reset_index(drop=True), full[position].reset_index(drop=True)
+        try:
+            pd.testing.assert_frame_equal(left, right, check_dtype=False, check_categorical=False)
+        except AssertionError:
+            if left.shape != right.shape:
+                differences[name] = abs(len(left) - len(right)) or len(left)
+            else:
+                differences[name] = int((left.astype(str) != right.astype(str)).any(axis=1).sum())
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000], help='이카운트 주문 행 수 (여러 개 가능)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # 읽은 업로드 디스크 캐시를 끕니다 (실행마다 같은 조건으로 재도록)
+    os.environ[UPLOAD_CACHE_DIR_ENV] = ''
+    master = get_master_store(os.path.join(ROOT_DIR, 'master_data.csv'))
+    failed = False
+    print(f"{'rows':>8} {'full(s)':>8} {'morning(s)':>11} {'afternoon(s)':>13}  result")
+    for n_rows in args.rows:
+        frames = generate_orders(n_rows, seed=args.seed)
+        full, full_time = run(frames, master)
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = OrderStateStore(os.path.join(directory, 'order_state.sqlite3'))
+            _, morning_time = run(morning_files(frames), master, state_store)
+            incremental, afternoon_time = run(frames, master, state_store)
+        differences = compare(incremental, full)
+        failed = failed or bool(differences)
+        summary = ', '.join(f"{name} {count:,}행 다름" for name, count in differences.items()) or '전체 처리와 같음'
+        print(f"{n_rows:>8} {full_time:>8.2f} {morning_time:>11.2f} {afternoon_time:>13.2f}  {summary}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
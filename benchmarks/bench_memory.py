@@ -0,0 +1,82 @@
+"""메모리 벤치마크: 합성 주문 파일로 process_all_files를 새 프로세스에서 한 번 돌려 최대 RSS를 잽니다.
+
+RSS(ru_maxrss)는 프로세스 전체의 최대값이라 한 프로세스에서 여러 번 잴 수 없으므로 규모마다 자식 프로세스를 띄웁니다.
+tracemalloc은 Arrow 문자열 버퍼를 보지 못하므로 여기서는 쓰지 않습니다. 파일 읽기 프로세스 풀은 끕니다
+(자식 프로세스의 메모리는 ru_maxrss에 들어가지 않음).
+
+사용법:
+    python benchmarks/bench_memory.py --rows 100000 1000000 --format csv
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from bench_pipeline import order_files  # noqa: E402
+from synthetic_orders import ROOT_DIR  # noqa: E402
+from upload_cache import UPLOAD_CACHE_DIR_ENV  # noqa: E402
+
+
+def _max_rss_mb():
+    # 리눅스에서 ru_maxrss 단위는 KB입니다 (macOS는 바이트)
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def measure(n_rows, file_format, seed):
+    """자식 프로세스에서 실행합니다: 입력 bytes를 읽은 뒤의 RSS와 처리 후 최대 RSS, 결과 표별 메모리(MB)."""
+    from master_store import get_master_store
+    from refine_pipeline import process_all_files
+
+    payloads = order_files(n_rows, file_format, seed)
+    master = get_master_store(os.path.join(ROOT_DIR, 'master_data.csv'))
+    before = _max_rss_mb()
+    result = process_all_files(
+        io.BytesIO(payloads['smartstore']), io.BytesIO(payloads['ecount']), io.BytesIO(payloads['godomall']),
+        master, parallel_read=False,
+    )
+    if not result[5]:
+        raise RuntimeError(result[6])
+    names = ['최종 보정 리스트', '출고수량 요약', '포장 리스트', '이카운트 업로드']
+    frames = {name: result[position].memory_usage(deep=True).sum() / 1024 / 1024 for position, name in enumerate(names)}
+    return {'before_mb': before, 'peak_mb': _max_rss_mb(), 'frames_mb': frames}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000], help='이카운트 주문 행 수 (여러 개 가능)')
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='csv', help='합성 입력 파일 형식')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 읽은 업로드 디스크 캐시를 끕니다 (캐시 읽기가 아닌 파일 파싱의 메모리를 재도록)
+    os.environ[UPLOAD_CACHE_DIR_ENV] = ''
+    if args.child:
+        print(json.dumps(measure(args.rows[0], args.format, args.seed), ensure_ascii=False))
+        return 0
+
+    for n_rows in args.rows:
+        # 합성 파일은 여기서 미리 만들어 두어 생성에 쓴 메모리가 측정에 섞이지 않게 합니다
+        order_files(n_rows, args.format, args.seed)
+        completed = subprocess.run(
+            [sys.executable, __file__, '--child', '--rows', str(n_rows), '--format', args.format, '--seed', str(args.seed)],
+            capture_output=True, text=True, check=True,
+        )
+        stats = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"\n== {n_rows:,}행 ({args.format})")
+        print(f"  처리 전 RSS {stats['before_mb']:>9.0f} MB")
+        print(f"  최대 RSS    {stats['peak_mb']:>9.0f} MB (처리 중 +{stats['peak_mb'] - stats['before_mb']:.0f} MB)")
+        for name, size in stats['frames_mb'].items():
+            print(f"  {name:<12} {size:>9.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""파이프라인 벤치마크: 합성 주문 파일로 process_all_files 단계별 시간과 format_type별 엑셀 내보내기 시간을 잽니다.
+
+결과는 JSON 기록 파일에 쌓이고, 같은 컴퓨터에서 잰 같은 규모(행 수, 파일 형식)의 최근 기록과 비교해
+어느 단계든 threshold 이상 느려지면 종료 코드 1로 끝납니다.
+
+사용법:
+    python benchmarks/bench_pipeline.py --rows 1000 10000 100000
+    python benchmarks/bench_pipeline.py --rows 1000000 --format csv --threshold 0.3
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from excel_export import to_excel_formatted  # noqa: E402
+from master_store import get_master_store  # noqa: E402
+from profiling import StageProfiler  # noqa: E402
+from refine_pipeline import process_all_files  # noqa: E402
+from synthetic_orders import FILE_NAMES, ROOT_DIR, generate_orders, write_order_files  # noqa: E402
+from upload_cache import UPLOAD_CACHE_DIR_ENV  # noqa: E402
+
+DEFAULT_HISTORY = os.path.join(BENCH_DIR, 'history.json')
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+
+# (format_type, process_all_files 결과 위치): 이카운트 업로드, 포장 리스트, 출고수량 요약, 최종 보정 리스트
+EXPORTS = [('ecount_upload', 3), ('packing_list', 2), ('quantity_summary', 1), (None, 0)]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def order_files(n_rows, file_format, seed):
+    """합성 파일을 만들어 두고(이미 있으면 재사용) 슬롯별 bytes를 돌려줍니다. 큰 xlsx는 만드는 데 오래 걸립니다."""
+    output_dir = os.path.join(DATA_DIR, f"{n_rows}_{seed}_{file_format}")
+    paths = {slot: os.path.join(output_dir, f"{name}.{file_format}") for slot, name in FILE_NAMES.items()}
+    if not all(os.path.exists(path) for path in paths.values()):
+        paths = write_order_files(generate_orders(n_rows, seed=seed), output_dir, file_format)
+    payloads = {}
+    for slot, path in paths.items():
+        with open(path, 'rb') as f:
+            payloads[slot] = f.read()
+    return payloads
+
+
+def run_once(payloads, master):
+    """한 번 실행해 {단계: 초}를 돌려줍니다. 내보내기는 '내보내기: format_type' 단계로 들어갑니다."""
+    profiler = StageProfiler()
+    result = process_all_files(
+        io.BytesIO(payloads['smartstore']), io.BytesIO(payloads['ecount']), io.BytesIO(payloads['godomall']),
+        master, profiler=profiler,
+    )
+    if not result[5]:
+        raise RuntimeError(result[6])
+    for format_type, position in EXPORTS:
+        with profiler.stage(f"내보내기: {format_type or '기본'}", len(result[position])):
+            to_excel_formatted(result[position], format_type=format_type)
+    return {record['stage']: record['seconds'] for record in profiler.records if record['parent'] is None}
+
+
+def benchmark(n_rows, file_format, seed, repeat, master):
+    """repeat번 실행해 단계별 최소 시간을 씁니다 (잡음이 가장 적은 값)."""
+    payloads = order_files(n_rows, file_format, seed)
+    runs = [run_once(payloads, master) for _ in range(repeat)]
+    stages = {stage: min(run[stage] for run in runs) for stage in runs[0]}
+    stages['합계'] = sum(stages.values())
+    return stages
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_regressions(entry, history, threshold, min_seconds, baseline_runs):
+    """같은 컴퓨터, 같은 규모의 최근 baseline_runs개 기록 중앙값보다 threshold 비율 이상, min_seconds 이상 느려진 단계 목록."""
+    same_scale = ('machine', 'rows', 'format', 'seed')
+    previous = [past for past in history if all(past.get(key) == entry[key] for key in same_scale)][-baseline_runs:]
+    regressions = []
+    for stage, seconds in entry['stages'].items():
+        past_values = [past['stages'][stage] for past in previous if stage in past['stages']]
+        if not past_values:
+            continue
+        baseline = statistics.median(past_values)
+        if seconds > baseline * (1 + threshold) and seconds - baseline >= min_seconds:
+            regressions.append((stage, baseline, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='이카운트 주문 행 수 (여러 개 가능)')
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help='합성 입력 파일 형식')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='규모마다 반복 횟수 (단계별 최소값 사용)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON 기록 파일')
+    parser.add_argument('--no-record', action='store_true', help='기록 파일에 결과를 남기지 않음')
+    parser.add_argument('--threshold', type=float, default=0.25, help='느려짐 허용 비율 (기본값: 0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='이보다 작은 차이는 잡음으로 봄')
+    parser.add_argument('--baseline-runs', type=int, default=5, help='비교 기준으로 쓸 최근 기록 수')
+    args = parser.parse_args()
+
+    # 읽은 업로드 디스크 캐시를 끕니다 (반복 실행에서 파일 파싱 시간 대신 캐시 읽기 시간을 재지 않도록)
+    os.environ[UPLOAD_CACHE_DIR_ENV] = ''
+    master = get_master_store(os.path.join(ROOT_DIR, 'master_data.csv'))
+    history = load_history(args.history)
+    environment = {
+        'commit': _git_commit(), 'python': platform.python_version(), 'pandas': pd.__version__,
+        'machine': platform.node(), 'cpu_count': os.cpu_count(),
+    }
+
+    new_entries = []
+    failed = False
+    for n_rows in args.rows:
+        started = time.perf_counter()
+        stages = benchmark(n_rows, args.format, args.seed, args.repeat, master)
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'), **environment,
+            'rows': n_rows, 'format': args.format, 'seed': args.seed, 'stages': stages,
+        }
+        print(f"\n== {n_rows:,}행 ({args.format}) - 측정 {time.perf_counter() - started:.1f}초")
+        for stage, seconds in stages.items():
+            print(f"  {stage:<28} {seconds:>9.3f}초")
+
+        regressions = find_regressions(entry, history, args.threshold, args.min_seconds, args.baseline_runs)
+        for stage, baseline, seconds in regressions:
+            print(f"  [느려짐] {stage}: {baseline:.3f}초 → {seconds:.3f}초 ({seconds / baseline - 1:+.0%})")
+        failed = failed or bool(regressions)
+        new_entries.append(entry)
+
+    if not args.no_record:
+        with open(args.history, 'w', encoding='utf-8') as f:
+            json.dump(history + new_entries, f, ensure_ascii=False, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""벤치마크용 합성 주문 파일 생성기 (스마트스토어, 이카운트, 고도몰)
+
+- 상품은 master_data.csv의 SKU를 쓰고, 약 1%는 마스터에 없는 코드입니다 (미등록 상품).
+- 수령자 이름은 흔한 이름 목록에서 뽑아 같은 이름이 떨어진 주문에 다시 나옵니다 (동명이인 의심).
+- [BOX] 상품과 '3개입' 상품명이 섞여 있습니다.
+- 고도몰은 '12,000원' 형식 금액, 배송비, 회원/쿠폰 할인, 마일리지 열이 있고 약 1%는 총 결제 금액이 맞지 않습니다.
+- 스마트스토어 주문의 약 1%는 스마트스토어 파일에 없습니다 (금액보정 실패).
+- 각 파일에는 파이프라인이 쓰지 않는 열도 들어 있습니다 (열 선택 읽기 확인용).
+
+사용법:
+    python benchmarks/synthetic_orders.py --rows 10000 -o benchmarks/data/10000
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MALL_SHARES = {'스마트스토어': 0.4, '고도몰5': 0.25, '쿠팡': 0.2, '배민상회': 0.1, '이지웰몰': 0.05}
+FAMILY_NAMES = list('김이박최정강조윤장임한오서신권황안송류홍')
+GIVEN_NAMES = ['민준', '서연', '도윤', '하은', '시우', '지우', '주원', '서윤', '예준', '지호', '수아', '하준', '지민', '은우', '유나']
+SHIPPING_FEE = 3000
+
+# 슬롯 → 파일 이름 (main.py의 날짜 폴더 규칙과 같은 단어를 씁니다)
+FILE_NAMES = {'smartstore': '스마트스토어', 'ecount': '이카운트', 'godomall': '고도몰'}
+
+
+def _recipients(rng, n_orders):
+    """주문마다 수령자 이름. 이름 수를 주문 수보다 적게 잡아 같은 이름이 여러 주문에 나옵니다."""
+    names = np.array([family + given for family in FAMILY_NAMES for given in GIVEN_NAMES])
+    n_names = min(len(names), max(n_orders // 2, 1))
+    pool = names[:n_names]
+    # 이름이 모자라면 번호를 붙여 늘립니다 (큰 규모에서도 같은 이름이 적당히 반복되도록)
+    if n_orders // 2 > len(names):
+        suffixes = np.arange(n_orders // 2 // len(names) + 1).astype(str)
+        pool = (names[:, None] + suffixes[None, :]).ravel()
+    return pool[rng.integers(0, len(pool), n_orders)]
+
+
+def generate_orders(n_lines, master_path=os.path.join(ROOT_DIR, 'master_data.csv'), seed=0):
+    """n_lines 행짜리 이카운트 주문 목록과, 그 주문에 맞는 스마트스토어/고도몰 파일을 만듭니다.
+
+    반환값: {'smartstore': df, 'ecount': df, 'godomall': df}
+    """
+    rng = np.random.default_rng(seed)
+    df_master = pd.read_csv(master_path, dtype={'SKU코드': str}).drop_duplicates(subset=['SKU코드'])
+    skus = np.append(df_master['SKU코드'].to_numpy(str), [f"X{i:03d}Z" for i in range(max(len(df_master) // 100, 1))])
+    names = np.append(df_master['SKU상품명'].to_numpy(str), ['미등록 테스트 상품'] * (len(skus) - len(df_master)))
+    unit_prices = rng.integers(5, 60, len(skus)) * 1000
+
+    # 주문(수령자) 하나에 1~4줄
+    lines_per_order = rng.integers(1, 5, n_lines)
+    order_of_line = np.repeat(np.arange(n_lines), lines_per_order)[:n_lines]
+    n_orders = order_of_line[-1] + 1
+    malls = np.array(list(MALL_SHARES))
+    order_mall = malls[rng.choice(len(malls), n_orders, p=list(MALL_SHARES.values()))]
+    order_recipient = _recipients(rng, n_orders)
+
+    unregistered = rng.random(n_lines) < 0.01
+    sku_idx = np.where(unregistered, rng.integers(len(df_master), len(skus), n_lines), rng.integers(0, len(df_master), n_lines))
+    quantity = rng.choice([1, 1, 1, 2, 2, 3, 5], n_lines)
+    product_names = names[sku_idx].astype(object)
+    three_pack = rng.random(n_lines) < 0.05
+    product_names[three_pack] = product_names[three_pack] + ' 3개입'
+    amount = unit_prices[sku_idx] * quantity
+
+    df_ecount = pd.DataFrame({
+        '주문번호': order_of_line + 100000,
+        '재고관리코드': skus[sku_idx],
+        'SKU상품명': product_names,
+        '주문수량': quantity,
+        '금액': amount,
+        '쇼핑몰': order_mall[order_of_line],
+        '수령자명': order_recipient[order_of_line],
+        '배송메모': '문 앞에 놓아 주세요',
+    })
+
+    is_store = df_ecount['쇼핑몰'] == '스마트스토어'
+    # 스마트스토어 주문의 약 1%는 스마트스토어 파일에 없습니다 (금액보정 실패)
+    df_store = df_ecount[is_store & (rng.random(n_lines) > 0.01)]
+    df_smartstore = pd.DataFrame({
+        '상품주문번호': np.arange(len(df_store)) + 2024000000,
+        '재고관리코드': df_store['재고관리코드'].to_numpy(),
+        '주문수량': df_store['주문수량'].to_numpy(),
+        '수령자명': df_store['수령자명'].to_numpy(),
+        '실결제금액': df_store['금액'].to_numpy() - rng.choice([0, 0, 500, 1000], len(df_store)),
+        '배송지': '서울특별시 강남구',
+    })
+
+    is_godomall = df_ecount['쇼핑몰'] == '고도몰5'
+    df_godo = df_ecount[is_godomall]
+    item_amount = df_godo['금액'].to_numpy()
+    member_discount = (item_amount * rng.choice([0, 0, 0.05], len(df_godo))).round(-1).astype(int)
+    coupon_discount = rng.choice([0, 0, 0, 1000, 2000], len(df_godo))
+    mileage = rng.choice([0, 0, 0, 0, 500], len(df_godo))
+    df_godomall = pd.DataFrame({
+        '주문번호': df_godo['주문번호'].to_numpy() + 5000000,
+        '재고관리코드': df_godo['재고관리코드'].to_numpy(),
+        '수취인 이름': df_godo['수령자명'].to_numpy(),
+        '상품수량': df_godo['주문수량'].to_numpy(),
+        '상품별 품목금액': [f"{value:,}원" for value in item_amount],
+        '총 배송 금액': SHIPPING_FEE,
+        '회원 할인 금액': member_discount,
+        '쿠폰 할인 금액': coupon_discount,
+        '사용된 마일리지': mileage,
+    })
+    # 총 결제 금액은 수취인별 합계(배송비 한 번)로 주문의 모든 행에 적고, 약 1%는 일부러 틀리게 둡니다
+    line_total = item_amount - member_discount - coupon_discount - mileage
+    recipient_total = pd.Series(line_total).groupby(df_godomall['수취인 이름'].to_numpy()).transform('sum').to_numpy()
+    mismatch = rng.random(len(df_godomall)) < 0.01
+    df_godomall['총 결제 금액'] = recipient_total + SHIPPING_FEE + np.where(mismatch, 700, 0)
+
+    return {'smartstore': df_smartstore, 'ecount': df_ecount, 'godomall': df_godomall}
+
+
+def write_order_files(frames, output_dir, file_format='xlsx'):
+    """슬롯별 데이터프레임을 output_dir에 xlsx 또는 csv로 씁니다. {슬롯: 경로}를 돌려줍니다."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for slot, df in frames.items():
+        path = os.path.join(output_dir, f"{FILE_NAMES[slot]}.{file_format}")
+        if file_format == 'csv':
+            df.to_csv(path, index=False, encoding='utf-8-sig')
+        else:
+            df.to_excel(path, index=False)
+        paths[slot] = path
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='이카운트 주문 행 수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx')
+    parser.add_argument('-o', '--output-dir', required=True)
+    args = parser.parse_args()
+
+    paths = write_order_files(generate_orders(args.rows, seed=args.seed), args.output_dir, args.format)
+    for slot, path in paths.items():
+        print(f"{slot}: {path}")
+
+
+if __name__ == '__main__':
+    main()
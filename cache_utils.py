@@ -0,0 +1,72 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# 캐시 공용 유틸리티
+# --------------------------------------------------------------------------
+
+def hash_dataframe(df):
+    """데이터프레임의 열 이름, dtype, 값으로 내용 해시(hex)를 만듭니다."""
+    hasher = hashlib.sha256()
+    hasher.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode('utf-8'))
+    hasher.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return hasher.hexdigest()
+
+
+class LRUCache:
+    """크기 상한을 두는 LRU 캐시. 상한을 넘으면 가장 오래 쓰지 않은 항목부터 버립니다.
+
+    size_of는 항목 하나의 크기를 돌려주는 함수이며, 기본값은 항목 개수로 셉니다.
+    Streamlit의 지연 다운로드 콜백은 별도 스레드에서 실행되므로 잠금으로 보호합니다.
+    """
+
+    def __init__(self, max_size, size_of=None):
+        self.max_size = max_size
+        self.size_of = size_of or (lambda value: 1)
+        self.total_size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._items:
+                self.total_size -= self.size_of(self._items.pop(key))
+            # 상한보다 큰 항목은 저장하지 않습니다 (캐시 전체를 비우는 것을 막기 위함)
+            size = self.size_of(value)
+            if size > self.max_size:
+                return
+            self._items[key] = value
+            self.total_size += size
+            while self.total_size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.total_size -= self.size_of(evicted)
+
+    def get_or_build(self, key, build):
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+
+class BytesLRUCache(LRUCache):
+    """총 바이트 수로 상한을 두는 LRU 캐시."""
+
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes, size_of=len)
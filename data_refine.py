@@ -1,287 +1,103 @@
 import streamlit as st
-import pandas as pd
-import io
-import numpy as np
-import openpyxl
-from openpyxl.styles import PatternFill, Border, Side, Alignment
-from openpyxl.utils import get_column_letter
+import time
 from datetime import datetime
+from functools import partial
+
+from excel_export import XLSX_MIME, to_excel_cached
+from ingest import UPLOAD_SLOTS, parse_upload
+from jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JobRunner, MemoryBudget, default_memory_budget
+from master_store import get_master_store
+from order_state import OrderStateStore
+from refine_pipeline import PIPELINE_STAGES, process_all_files
+from upload_schema import upload_problem
+from upload_store import spill_upload
+from validation import ISSUE_CATEGORIES
+
+# 처리 중인 작업의 진행 상황을 다시 그리는 간격(초)
+JOB_POLL_SECONDS = 1
+# 세션 하나가 올린 파일 3개를 읽고 처리하는 데 쓸 수 있는 메모리 추정값 상한
+SESSION_MEMORY_BUDGET_BYTES = 2 * 1024 * 1024 * 1024
+# 동시에 실행하는 미리 읽기, 처리 작업과 보관된 미리 읽은 데이터프레임의 메모리 추정값 합의 상한 (물리 메모리의 절반)
+SERVER_MEMORY_BUDGET_BYTES = default_memory_budget()
+# 미리 읽어 둔 업로드 파일을 보관할 개수 (이틀치 파일 3개씩)
+PARSED_UPLOADS_MAX_ENTRIES = 6
+# 확인 필요 항목 표의 한 페이지 행 수
+ISSUE_PAGE_SIZE = 200
+# 증분 처리 상태 저장소 파일
+ORDER_STATE_PATH = "order_state.sqlite3"
+# 결과 이름 → (엑셀 format_type, 표시 이름, 다운로드 파일 이름 앞부분). 탭 순서와 같습니다
+EXPORTS = {
+    'ecount_upload': ('ecount_upload', '이카운트 업로드용', '이카운트_업로드용'),
+    'packing_list': ('packing_list', '포장 리스트', '물류팀_전달용_포장리스트'),
+    'quantity_summary': ('quantity_summary', '출고수량 요약', '물류팀_전달용_출고수량'),
+    'main': (None, '최종 보정 리스트', '최종_실결제금액_보정완료'),
+}
 
 # --------------------------------------------------------------------------
-# 함수 정의
+# 백그라운드 작업
 # --------------------------------------------------------------------------
+# 처리는 백그라운드 작업으로 맡기고 버튼 처리기는 바로 끝납니다. 작업이 끝날 때까지 JOB_POLL_SECONDS마다
+# 화면을 다시 그려 진행 단계와 지금까지 나온 결과를 보여 줍니다. 작업 키는 (업로드 파일 3개의 내용 해시,
+# 마스터 데이터 버전, 증분 처리 여부)이며, 같은 키의 작업은 다른 세션에서 맡겨도 한 번만 실행합니다.
+# 끝난 작업의 결과는 프로세스에 보관되므로 브라우저 연결이 끊겨도 같은 파일로 다시 누르면 바로 보여 줍니다.
+#
+# 업로드된 파일은 버튼을 누르기 전에 파일마다 백그라운드에서 미리 읽어 둡니다 (작업 키: 슬롯, 내용 해시).
+# 세션은 슬롯의 파일 내용이 바뀔 때만 읽기를 맡기고, 파일을 바꾸거나 지우면 이전 읽기 작업의 참조를 놓습니다.
+# 같은 파일을 읽는 다른 세션이 없을 때만 읽기가 취소됩니다. 처리 작업은 미리 읽은 데이터프레임에서 시작합니다.
+#
+# 업로드 파일은 올라오자마자 임시 파일로 옮기고(upload_store), 작업에는 업로드 객체 대신 이 파일을 넘깁니다.
+# 세션의 파일들을 처리하는 데 드는 메모리 추정값이 SESSION_MEMORY_BUDGET_BYTES를 넘으면 처리하지 않습니다.
+# 미리 읽기와 처리 작업은 메모리 예산 하나(SERVER_MEMORY_BUDGET_BYTES)를 함께 씁니다. 미리 읽기 작업은 파일을 읽는
+# 동안 파일의 추정 메모리를, 끝난 뒤에는 보관되는 데이터프레임의 크기를 예약하고, 처리 작업은 미리 읽은 파일에 대해
+# 데이터프레임 외에 더 드는 메모리만 예약합니다. 처리 작업은 미리 읽기가 끝난 뒤에 예약합니다 (jobs.JobRunner.submit의 after).
+@st.cache_resource
+def get_memory_budget():
+    return MemoryBudget(SERVER_MEMORY_BUDGET_BYTES)
 
-def to_excel_formatted(df, format_type=None):
-    """데이터프레임을 서식이 적용된 엑셀 파일 형식의 BytesIO 객체로 변환하는 함수"""
-    output = io.BytesIO()
-    df_to_save = df.fillna('')
-    
-    if format_type == 'ecount_upload':
-        df_to_save = df_to_save.rename(columns={'적요_전표': '적요', '적요_품목': '적요.1'})
-
-    df_to_save.to_excel(output, index=False, sheet_name='Sheet1')
-    
-    workbook = openpyxl.load_workbook(output)
-    sheet = workbook.active
-
-    # 공통 서식: 모든 셀 가운데 정렬
-    center_alignment = Alignment(horizontal='center', vertical='center')
-    for row in sheet.iter_rows():
-        for cell in row:
-            cell.alignment = center_alignment
-
-    # 파일별 특수 서식
-    for column_cells in sheet.columns:
-        max_length = 0
-        column = column_cells[0].column_letter
-        for cell in column_cells:
-            try:
-                if cell.value:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        sheet.column_dimensions[column].width = adjusted_width
-    
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-    pink_fill = PatternFill(start_color="FFEBEE", end_color="FFEBEE", fill_type="solid") # 연한 핑크
-
-    if format_type == 'packing_list':
-        for row in sheet.iter_rows(min_row=1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
-            for cell in row:
-                cell.border = thin_border
-        
-        bundle_start_row = 2
-        for row_num in range(2, sheet.max_row + 2):
-            current_bundle_cell = sheet.cell(row=row_num, column=1) if row_num <= sheet.max_row else None
-            
-            if (current_bundle_cell and current_bundle_cell.value) or (row_num > sheet.max_row):
-                if row_num > 2:
-                    bundle_end_row = row_num - 1
-                    prev_bundle_num_str = str(sheet.cell(row=bundle_start_row, column=1).value)
-                    
-                    if prev_bundle_num_str.isdigit():
-                        prev_bundle_num = int(prev_bundle_num_str)
-                        if prev_bundle_num % 2 != 0:
-                            for r in range(bundle_start_row, bundle_end_row + 1):
-                                for c in range(1, sheet.max_column + 1):
-                                    sheet.cell(row=r, column=c).fill = pink_fill
-                    
-                    if bundle_start_row < bundle_end_row:
-                        sheet.merge_cells(start_row=bundle_start_row, start_column=1, end_row=bundle_end_row, end_column=1)
-                        sheet.merge_cells(start_row=bundle_start_row, start_column=4, end_row=bundle_end_row, end_column=4)
-                
-                bundle_start_row = row_num
-
-    if format_type == 'quantity_summary':
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column)):
-            for cell in row:
-                cell.border = thin_border
-            if row_idx > 0 and row_idx % 2 != 0:
-                for cell in row:
-                    cell.fill = pink_fill
-    
-    final_output = io.BytesIO()
-    workbook.save(final_output)
-    final_output.seek(0)
-    
-    return final_output.getvalue()
-
-@st.cache_data
-def load_local_master_data(file_path="master_data.csv"):
-    df_master = pd.read_csv(file_path)
-    df_master = df_master.drop_duplicates(subset=['SKU코드'], keep='first')
-    return df_master
-
-def process_all_files(file1, file2, file3, df_master):
-    try:
-        df_smartstore = pd.read_excel(file1)
-        df_ecount_orig = pd.read_excel(file2)
-        df_godomall = pd.read_excel(file3)
-
-        df_ecount_orig['original_order'] = range(len(df_ecount_orig))
-        
-        # ▼▼▼ [수정] 컬럼명 호환성 처리: '자체옵션코드'를 '재고관리코드'로 통일 ▼▼▼
-        # '회 할인 금액'과 '회원 할인 금액'을 모두 처리할 수 있도록 열 이름을 통일합니다.
-        if '회 할인 금액' in df_godomall.columns and '회원 할인 금액' not in df_godomall.columns:
-            df_godomall.rename(columns={'회 할인 금액': '회원 할인 금액'}, inplace=True)
-        if '자체옵션코드' in df_godomall.columns:
-            df_godomall.rename(columns={'자체옵션코드': '재고관리코드'}, inplace=True)
-        
-        # 1단계: 데이터 클리닝 강화
-        cols_to_numeric = ['상품별 품목금액', '총 배송 금액', '회원 할인 금액', '쿠폰 할인 금액', '사용된 마일리지', '총 결제 금액']
-        for col in cols_to_numeric:
-            if col in df_godomall.columns: 
-                df_godomall[col] = pd.to_numeric(df_godomall[col].astype(str).str.replace('[원,]', '', regex=True), errors='coerce').fillna(0)
-        
-        # 2단계: 배송비 중복 계산 방지
-        df_godomall['보정된_배송비'] = np.where(
-            df_godomall.duplicated(subset=['수취인 이름']), 
-            0, 
-            df_godomall['총 배송 금액']
-        )
-        
-        df_godomall['수정될_금액_고도몰'] = (
-            df_godomall['상품별 품목금액'] + df_godomall['보정된_배송비'] - df_godomall['회원 할인 금액'] - 
-            df_godomall['쿠폰 할인 금액'] - df_godomall['사용된 마일리지']
-        )
-        
-        # 3단계: 결제 금액 검증 및 알림 기능 추가
-        godomall_warnings = []
-        grouped_godomall = df_godomall.groupby('수취인 이름')
-        
-        for name, group in grouped_godomall:
-            calculated_total = group['수정될_금액_고도몰'].sum()
-            actual_total = group['총 결제 금액'].iloc[0]
-            discrepancy = calculated_total - actual_total
-            
-            if abs(discrepancy) > 1:
-                warning_msg = f"- [고도몰 금액 불일치] **{name}**님의 주문의 계산된 금액과 실제 결제 금액이 **{discrepancy:,.0f}원** 만큼 차이납니다. (계산값: {calculated_total:,.0f}원, 실제값: {actual_total:,.0f}원)"
-                godomall_warnings.append(warning_msg)
-
-        # 기존 처리 로직 시작
-        df_final = df_ecount_orig.copy().rename(columns={'금액': '실결제금액'})
-        
-        # 스마트스토어 병합 준비
-        key_cols_smartstore = ['재고관리코드', '주문수량', '수령자명']
-        smartstore_prices = df_smartstore.rename(columns={'실결제금액': '수정될_금액_스토어'})[key_cols_smartstore + ['수정될_금액_스토어']].drop_duplicates(subset=key_cols_smartstore, keep='first')
-        
-        # ▼▼▼ [수정] 고도몰 병합 기준(Key)에 '재고관리코드'를 추가하여 상품을 정확히 식별 ▼▼▼
-        key_cols_godomall = ['재고관리코드', '수취인 이름', '상품수량']
-        godomall_prices_for_merge = df_godomall[key_cols_godomall + ['수정될_금액_고도몰']].rename(
-            columns={'수취인 이름': '수령자명', '상품수량': '주문수량'}
-        )
-        # 중복 제거 기준도 새로운 Key로 변경
-        godomall_prices_for_merge = godomall_prices_for_merge.drop_duplicates(
-            subset=['재고관리코드', '수령자명', '주문수량'], keep='first'
-        )
-        
-        # 데이터 타입 통일 (병합 전)
-        for col in ['재고관리코드', '수령자명']:
-            df_final[col] = df_final[col].astype(str).str.strip()
-            smartstore_prices[col] = smartstore_prices[col].astype(str).str.strip()
-            godomall_prices_for_merge[col] = godomall_prices_for_merge[col].astype(str).str.strip()
-        
-        for col in ['주문수량']:
-            df_final[col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0).astype(int)
-            smartstore_prices[col] = pd.to_numeric(smartstore_prices[col], errors='coerce').fillna(0).astype(int)
-            godomall_prices_for_merge[col] = pd.to_numeric(godomall_prices_for_merge[col], errors='coerce').fillna(0).astype(int)
-
-        df_final['실결제금액'] = pd.to_numeric(df_final['실결제금액'], errors='coerce').fillna(0).astype(int)
-        
-        # 데이터 병합
-        df_final = pd.merge(df_final, smartstore_prices, on=key_cols_smartstore, how='left')
-        
-        # ▼▼▼ [수정] 병합을 새로운 기준(Key)으로 수행 ▼▼▼
-        df_final = pd.merge(df_final, godomall_prices_for_merge, 
-                            on=['재고관리코드', '수령자명', '주문수량'], 
-                            how='left')
-
-        # 경고 메시지 생성 및 통합
-        warnings = [f"- [금액보정 실패] **{row['쇼핑몰']}** / {row['수령자명']} / {row['SKU상품명']}" for _, row in df_final[(df_final['쇼핑몰'] == '스마트스토어') & (df_final['수정될_금액_스토어'].isna()) | (df_final['쇼핑몰'] == '고도몰5') & (df_final['수정될_금액_고도몰'].isna())].iterrows()]
-        warnings.extend(godomall_warnings)
-
-        # 최종 결제 금액 업데이트
-        df_final['실결제금액'] = np.where(df_final['쇼핑몰'] == '고도몰5', df_final['수정될_금액_고도몰'].fillna(df_final['실결제금액']), df_final['실결제금액'])
-        df_final['실결제금액'] = np.where(df_final['쇼핑몰'] == '스마트스토어', df_final['수정될_금액_스토어'].fillna(df_final['실결제금액']), df_final['실결제금액'])
-        
-        df_main_result = df_final[['재고관리코드', 'SKU상품명', '주문수량', '실결제금액', '쇼핑몰', '수령자명', 'original_order']]
-        
-        # 동명이인 경고 추가
-        homonym_warnings = []
-        name_groups = df_main_result.groupby('수령자명')['original_order'].apply(list)
-        for name, orders in name_groups.items():
-            if len(orders) > 1 and (max(orders) - min(orders) + 1) != len(orders):
-                homonym_warnings.append(f"- [동명이인 의심] **{name}** 님의 주문이 떨어져서 입력되었습니다. 확인이 필요합니다.")
-        warnings.extend(homonym_warnings)
-
-        df_quantity_summary = df_main_result.groupby('SKU상품명', as_index=False)['주문수량'].sum().rename(columns={'주문수량': '개수'})
-        df_packing_list = df_main_result.sort_values(by='original_order')[['SKU상품명', '주문수량', '수령자명', '쇼핑몰']].copy()
-        is_first_item = df_packing_list['수령자명'] != df_packing_list['수령자명'].shift(1)
-        df_packing_list['묶음번호'] = is_first_item.cumsum()
-        df_packing_list_final = df_packing_list.copy()
-        df_packing_list_final['묶음번호'] = df_packing_list_final['묶음번호'].where(is_first_item, '')
-        df_packing_list_final = df_packing_list_final[['묶음번호', 'SKU상품명', '주문수량', '수령자명', '쇼핑몰']]
-
-        df_merged = pd.merge(df_main_result, df_master[['SKU코드', '과세여부', '입수량']], left_on='재고관리코드', right_on='SKU코드', how='left')
-        
-        unmastered = df_merged[df_merged['SKU코드'].isna()]
-        for _, row in unmastered.iterrows():
-            warnings.append(f"- [미등록 상품] **{row['재고관리코드']}** / {row['SKU상품명']}")
-
-        client_map = {
-            '쿠팡': '쿠팡 주식회사', 
-            '고도몰5': '고래미자사몰_현금영수증(고도몰)', 
-            '스마트스토어': '스토어팜',
-            '배민상회': '주식회사 우아한형제들(배민상회)',
-            '이지웰몰': '주식회사 현대이지웰'
-        }
-        
-        df_ecount_upload = pd.DataFrame()
-        
-        df_ecount_upload['일자'] = datetime.now().strftime("%Y%m%d")
-        df_ecount_upload['거래처명'] = df_merged['쇼핑몰'].map(client_map).fillna(df_merged['쇼핑몰'])
-        df_ecount_upload['출하창고'] = '고래미'
-        df_ecount_upload['거래유형'] = np.where(df_merged['과세여부'] == '면세', 12, 11)
-        df_ecount_upload['적요_전표'] = '오전/온라인'
-        df_ecount_upload['품목코드'] = df_merged['재고관리코드']
-        
-        is_box_order = df_merged['SKU상품명'].str.contains("BOX", na=False)
-        입수량 = pd.to_numeric(df_merged['입수량'], errors='coerce').fillna(1)
-        base_quantity = np.where(is_box_order, df_merged['주문수량'] * 입수량, df_merged['주문수량'])
-        is_3_pack = df_merged['SKU상품명'].str.contains("3개입|3개", na=False)
-        final_quantity = np.where(is_3_pack, base_quantity * 3, base_quantity)
-        df_ecount_upload['박스'] = np.where(is_box_order, df_merged['주문수량'], np.nan)
-        df_ecount_upload['수량'] = final_quantity.astype(int)
-        
-        df_merged['실결제금액'] = pd.to_numeric(df_merged['실결제금액'], errors='coerce').fillna(0)
-        공급가액 = np.where(df_merged['과세여부'] == '과세', df_merged['실결제금액'] / 1.1, df_merged['실결제금액'])
-        df_ecount_upload['공급가액'] = 공급가액
-        df_ecount_upload['부가세'] = df_merged['실결제금액'] - df_ecount_upload['공급가액']
-        
-        df_ecount_upload['쇼핑몰고객명'] = df_merged['수령자명']
-        df_ecount_upload['original_order'] = df_merged['original_order']
-        
-        ecount_columns = [
-            '일자', '순번', '거래처코드', '거래처명', '담당자', '출하창고', '거래유형', '통화', '환율', 
-            '적요_전표', '미수금', '총합계', '연결전표', '품목코드', '품목명', '규격', '박스', '수량', 
-            '단가', '외화금액', '공급가액', '부가세', '적요_품목', '생산전표생성', '시리얼/로트', 
-            '관리항목', '쇼핑몰고객명', 'original_order'
-        ]
-        for col in ecount_columns:
-            if col not in df_ecount_upload:
-                df_ecount_upload[col] = ''
-        
-        for col in ['공급가액', '부가세']:
-            df_ecount_upload[col] = df_ecount_upload[col].round().astype('Int64')
-        
-        df_ecount_upload['거래유형'] = pd.to_numeric(df_ecount_upload['거래유형'])
-        
-        sort_order = [
-            '고래미자사몰_현금영수증(고도몰)', 
-            '스토어팜', 
-            '쿠팡 주식회사',
-            '주식회사 우아한형제들(배민상회)',
-            '주식회사 현대이지웰'
-        ]
-        
-        df_ecount_upload['거래처명_sort'] = pd.Categorical(df_ecount_upload['거래처명'], categories=sort_order, ordered=True)
-        
-        df_ecount_upload = df_ecount_upload.sort_values(
-            by=['거래처명_sort', '거래유형', 'original_order'],
-            ascending=[True, True, True]
-        ).drop(columns=['거래처명_sort', 'original_order'])
-        
-        df_ecount_upload = df_ecount_upload[ecount_columns[:-1]]
-
-        return df_main_result.drop(columns=['original_order']), df_quantity_summary, df_packing_list_final, df_ecount_upload, True, "모든 파일 처리가 성공적으로 완료되었습니다.", warnings
-
-    except Exception as e:
-        import traceback
-        st.error(f"처리 중 심각한 오류가 발생했습니다: {e}")
-        st.error(traceback.format_exc())
-        return None, None, None, None, False, f"오류가 발생했습니다. 파일을 다시 확인하거나 관리자에게 문의하세요.", []
+
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(memory_budget=get_memory_budget())
+
+
+@st.cache_resource
+def get_parse_runner():
+    return JobRunner(max_workers=len(UPLOAD_SLOTS), max_finished=PARSED_UPLOADS_MAX_ENTRIES, memory_budget=get_memory_budget())
+
+
+def parse_in_background(job, upload, slot):
+    """백그라운드 작업: 임시 파일로 옮긴 업로드 파일 하나를 읽어 (데이터프레임, 걸린 시간)을 'parsed'로 내놓습니다."""
+    with job.profiler.stage('파일 읽기'):
+        df, elapsed = parse_upload(upload, slot)
+    # 보관되는 동안 데이터프레임 크기만큼 메모리 예산에 남겨 둡니다
+    job.retained_memory = int(df.memory_usage(deep=True).sum())
+    job.publish('parsed', (df, elapsed))
+
+
+def run_processing(job, uploads, master, incremental, parse_jobs):
+    """백그라운드 작업: 파일을 처리해 결과를 내놓습니다. 엑셀 파일은 다운로드 버튼을 누를 때 만듭니다."""
+    # 아직 읽는 중인 파일은 처음부터 다시 읽지 않고 끝날 때까지 기다립니다. 실패했거나 취소된 파일만 다시 읽습니다
+    with job.profiler.stage('미리 읽기 대기'):
+        parsed = {slot: parse_job.results['parsed'] for slot, parse_job in parse_jobs.items() if parse_job.wait() and parse_job.status == JOB_DONE}
+    state_store = OrderStateStore(ORDER_STATE_PATH) if incremental else None
+    success, message = process_all_files(
+        *(uploads[slot] for slot in UPLOAD_SLOTS), master, state_store=state_store, profiler=job.profiler, publish=job.publish, parsed=parsed,
+    )[5:7]
+    if not success:
+        raise RuntimeError(message)
+    job.message = message
+
+
+def job_stages(incremental):
+    """진행률 계산에 쓰는 작업 단계 목록."""
+    stages = ['미리 읽기 대기', *PIPELINE_STAGES]
+    if incremental:
+        stages.insert(stages.index('이카운트 값 계산') + 1, '증분 상태 저장')
+    return stages
+
+
+runner = get_job_runner()
+parse_runner = get_parse_runner()
 
 # --------------------------------------------------------------------------
 # Streamlit 앱 UI 구성
@@ -300,47 +116,74 @@ with col2:
 with col3:
     file3 = st.file_uploader("3️⃣ 고도몰 (금액확인용)", type=['xlsx', 'xls', 'csv'])
 
+# 올라온 파일은 업로드마다 한 번 임시 파일로 옮기고(옮기면서 내용 해시도 계산) 머리글 행으로 슬롯에 맞는 파일인지 검사합니다
+spilled_uploads = st.session_state.setdefault('spilled_uploads', {})
+uploads, upload_problems = {}, {}
+for slot, file in zip(UPLOAD_SLOTS, (file1, file2, file3)):
+    if file is None:
+        spilled_uploads.pop(slot, None)
+        continue
+    if spilled_uploads.get(slot, (None,))[0] != file.file_id:
+        upload = spill_upload(file)
+        spilled_uploads[slot] = (file.file_id, upload, upload_problem(upload, slot))
+    _, uploads[slot], problem = spilled_uploads[slot]
+    if problem:
+        upload_problems[slot] = problem
+upload_hashes = {slot: upload.sha256 for slot, upload in uploads.items()}
+
+for problem in upload_problems.values():
+    st.error(f"🚨 {problem}")
+
+session_memory = sum(upload.estimated_memory for upload in uploads.values())
+over_budget = session_memory > SESSION_MEMORY_BUDGET_BYTES
+if over_budget:
+    st.error(
+        f"🚨 올린 파일을 처리하려면 메모리가 약 {session_memory / 1024 ** 3:.1f}GB 필요해 한 사람이 쓸 수 있는 한도"
+        f"({SESSION_MEMORY_BUDGET_BYTES / 1024 ** 3:.0f}GB)를 넘습니다. 파일을 나눠 올리거나 배치 실행(main.py --stream)을 이용해주세요."
+    )
+
+# 올라온 파일은 바로 미리 읽기 시작합니다 (검사에 실패한 파일은 읽지 않음). 슬롯의 파일이 바뀌었거나 지워졌으면 이전 파일 읽기 참조를 놓습니다.
+# 슬롯마다 (내용 해시, 작업 ID)를 기억해 같은 파일은 다시 맡기지 않습니다 (보관 기간이 지나 버려진 읽기 결과를 다시 읽지 않도록)
+parse_job_ids = st.session_state.setdefault('parse_job_ids', {})
+for slot in UPLOAD_SLOTS:
+    upload_hash = upload_hashes.get(slot) if slot not in upload_problems and not over_budget else None
+    previous_hash, previous_job_id = parse_job_ids.get(slot, (None, None))
+    if upload_hash == previous_hash:
+        continue
+    if previous_job_id is not None:
+        parse_runner.release(previous_job_id)
+    job_id = None
+    if upload_hash is not None:
+        job_id = parse_runner.submit(
+            ('parse', slot, upload_hash), partial(parse_in_background, upload=uploads[slot], slot=slot), memory=uploads[slot].estimated_memory,
+        )
+    parse_job_ids[slot] = (upload_hash, job_id)
+
 st.write("---")
 st.header("2. 처리 결과 확인 및 다운로드")
+
+# 하루에 여러 번 실행할 때, 오늘 이미 처리한 주문 행은 저장된 계산 결과를 다시 씁니다 (결과는 전체 처리와 같음)
+incremental = st.checkbox("⚡ 증분 처리 (오늘 이미 처리한 주문은 다시 계산하지 않음)", value=False)
+profile_memory = st.checkbox("🔬 단계별 메모리 사용량도 측정 (처리가 느려집니다)", value=False)
+
 if st.button("🚀 모든 데이터 처리 및 파일 생성 실행"):
-    if file1 and file2 and file3:
+    if over_budget:
+        st.error("🚨 메모리 한도를 넘는 파일은 처리할 수 없습니다.")
+    elif upload_problems:
+        st.error("🚨 잘못 올린 파일을 바꾼 뒤 다시 실행해주세요.")
+    elif file1 and file2 and file3:
         try:
-            df_master = load_local_master_data("master_data.csv")
-            
-            with st.spinner('모든 파일을 읽고 데이터를 처리하며 엑셀 서식을 적용 중입니다...'):
-                df_main, df_qty, df_pack, df_ecount, success, message, warnings = process_all_files(file1, file2, file3, df_master)
-            
-            if success:
-                st.success(message)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-                if warnings:
-                    st.warning("⚠️ 확인 필요 항목")
-                    with st.expander("자세한 목록 보기..."):
-                        st.info("금액 보정 실패, 미등록 상품, 동명이인 의심, 고도몰 금액 불일치 등의 데이터입니다. 원본 파일을 확인해주세요.")
-                        for warning_message in warnings:
-                            st.markdown(warning_message)
-                
-                tab_erp, tab_pack, tab_qty, tab_main = st.tabs(["🏢 **이카운트 업로드용**", "📋 포장 리스트", "📦 출고수량 요약", "✅ 최종 보정 리스트"])
-                
-                with tab_erp:
-                    st.dataframe(df_ecount.astype(str))
-                    st.download_button("📥 다운로드", to_excel_formatted(df_ecount, format_type='ecount_upload'), f"이카운트_업로드용_{timestamp}.xlsx")
-
-                with tab_pack:
-                    st.dataframe(df_pack)
-                    st.download_button("📥 다운로드", to_excel_formatted(df_pack, format_type='packing_list'), f"물류팀_전달용_포장리스트_{timestamp}.xlsx")
-
-                with tab_qty:
-                    st.dataframe(df_qty)
-                    st.download_button("📥 다운로드", to_excel_formatted(df_qty, format_type='quantity_summary'), f"물류팀_전달용_출고수량_{timestamp}.xlsx")
-                
-                with tab_main:
-                    st.dataframe(df_main)
-                    st.download_button("📥 다운로드", to_excel_formatted(df_main), f"최종_실결제금액_보정완료_{timestamp}.xlsx")
-            else:
-                st.error(message)
-        
+            master = get_master_store("master_data.csv")
+            job_key = (*upload_hashes.values(), master.version, incremental)
+            parse_jobs = {slot: parse_runner.get(job_id) for slot, (_, job_id) in parse_job_ids.items() if job_id is not None}
+            parse_jobs = {slot: parse_job for slot, parse_job in parse_jobs.items() if parse_job is not None}
+            # 미리 읽은 파일의 데이터프레임은 미리 읽기 작업이 예약해 두므로 처리에 더 드는 메모리만 예약합니다
+            job_memory = sum(upload.pipeline_memory if slot in parse_jobs else upload.estimated_memory for slot, upload in uploads.items())
+            st.session_state['active_job_id'] = runner.submit(
+                job_key, partial(run_processing, uploads=uploads, master=master, incremental=incremental, parse_jobs=parse_jobs),
+                stages=job_stages(incremental), trace_memory=profile_memory, memory=job_memory, after=list(parse_jobs.values()),
+            )
+
         except FileNotFoundError:
             st.error("🚨 치명적 오류: `master_data.csv` 파일을 찾을 수 없습니다! `app.py`와 동일한 폴더에 파일이 있는지 반드시 확인해주세요.")
         except Exception as e:
@@ -348,3 +191,70 @@ if st.button("🚀 모든 데이터 처리 및 파일 생성 실행"):
 
     else:
         st.warning("⚠️ 3개의 엑셀 파일을 모두 업로드해야 실행할 수 있습니다.")
+
+# 마지막으로 맡긴 작업이 현재 업로드된 파일과 같을 때만 결과를 보여줍니다
+active_job_id = st.session_state.get('active_job_id')
+job = None
+if active_job_id is not None and file1 and file2 and file3:
+    job = runner.get(active_job_id)
+    if job is not None and job.key[:3] != tuple(upload_hashes.values()):
+        job = None
+
+if job is not None:
+    results = job.results
+    profiler = job.profiler
+    timestamp = datetime.fromtimestamp(job.submitted_at).strftime("%Y%m%d_%H%M%S")
+
+    def excel_data(df, format_type=None, name='기본'):
+        # 다운로드 버튼을 누를 때 만들어지는 엑셀 파일도 성능 기록에 남깁니다
+        return profiler.wrap(f"내보내기: {name}", partial(to_excel_cached, df, format_type), len(df))
+
+    if job.status == JOB_FAILED:
+        st.error(job.message)
+    elif job.finished:
+        st.success(job.message)
+    elif job.status == JOB_QUEUED:
+        st.progress(0.0, text=f"⏳ 파일 미리 읽기가 끝나고 메모리 여유가 생기기를 기다리는 중입니다... ({job.elapsed_seconds:.0f}초 경과)")
+    else:
+        st.progress(job.progress, text=f"⏳ {job.status}: {job.current_stage or '마무리'} ({job.elapsed_seconds:.0f}초 경과) - 먼저 끝난 결과부터 아래에 보여 드립니다.")
+
+    df_issues = results.get('issues')
+    if df_issues is not None and not df_issues.empty:
+        st.warning(f"⚠️ 확인 필요 항목 {len(df_issues):,}건")
+        with st.expander("자세한 목록 보기..."):
+            st.info("금액 보정 실패, 미등록 상품, 동명이인 의심, 고도몰 금액 불일치 등의 데이터입니다. 원본 파일을 확인해주세요.")
+            st.write(" / ".join(f"{category} {count:,}건" for category, count in df_issues['구분'].value_counts(sort=False).items() if count))
+
+            # 항목이 수만 건이어도 브라우저가 멈추지 않도록 페이지 단위로 보여줍니다
+            selected = st.multiselect("구분", ISSUE_CATEGORIES, default=ISSUE_CATEGORIES, key="issue_categories")
+            df_shown = df_issues[df_issues['구분'].isin(selected)]
+            page_count = max((len(df_shown) - 1) // ISSUE_PAGE_SIZE + 1, 1)
+            page = st.number_input(f"페이지 (전체 {page_count:,}쪽)", min_value=1, max_value=page_count, value=1, key="issue_page")
+            st.dataframe(df_shown.iloc[(page - 1) * ISSUE_PAGE_SIZE:page * ISSUE_PAGE_SIZE], hide_index=True)
+            st.download_button("📥 전체 목록 다운로드", excel_data(df_issues, name='확인필요항목'), f"확인필요항목_{timestamp}.xlsx", mime=XLSX_MIME, key="download_issues")
+
+    df_payment = results.get('payment')
+    if df_payment is not None and not df_payment.empty:
+        with st.expander(f"💰 고도몰 결제 금액 불일치 ({len(df_payment)}건)"):
+            st.dataframe(df_payment)
+            st.download_button("📥 다운로드", excel_data(df_payment, name='고도몰 결제금액 불일치'), f"고도몰_결제금액_불일치_{timestamp}.xlsx", mime=XLSX_MIME, key="download_payment")
+
+    # 결과가 나오는 대로 다운로드 버튼을 보여 줍니다. 엑셀 파일은 버튼을 누를 때 만듭니다 (to_excel_cached의 캐시에 남음)
+    tabs = st.tabs(["🏢 **이카운트 업로드용**", "📋 포장 리스트", "📦 출고수량 요약", "✅ 최종 보정 리스트"])
+    for tab, (name, (format_type, label, file_prefix)) in zip(tabs, EXPORTS.items()):
+        with tab:
+            df = results.get(name)
+            if df is None:
+                st.caption("⏳ 처리 중입니다...")
+                continue
+            st.dataframe(df.astype(str) if name == 'ecount_upload' else df)
+            st.download_button("📥 다운로드", excel_data(df, format_type, label), f"{file_prefix}_{timestamp}.xlsx", mime=XLSX_MIME, key=f"download_{name}")
+
+    with st.expander(f"⏱️ 성능 (합계 {profiler.total_seconds:.2f}초)"):
+        st.caption("단계별 걸린 시간과 행 수입니다. 파일 읽기 아래 줄은 파일별 읽기 시간(동시에 읽음)이며, 엑셀 내보내기는 다운로드할 때 기록됩니다.")
+        st.dataframe(profiler.to_frame(), hide_index=True)
+
+    # 작업이 끝날 때까지 잠시 뒤 화면을 다시 그립니다
+    if not job.finished:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
@@ -0,0 +1,139 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# 이카운트 업로드 행 만들기
+# --------------------------------------------------------------------------
+# 주문 행마다 상품명 정규식을 다시 검사하지 않고, 상품명마다 한 번만 BOX 여부와 입수 배수를 판별해 둡니다
+# (상품명 판별은 프로세스 안에 캐시되어 다음 실행에도 다시 씁니다). 과세 구분은 상품 마스터의 과세여부 값마다
+# 한 번 계산합니다. 수량, 공급가액, 부가세는 이 분류 배열로 한 번에 계산하고, 업로드 양식은 정렬 순서대로
+# 모든 열을 한 번에 만듭니다.
+
+CLIENT_MAP = {
+    '쿠팡': '쿠팡 주식회사',
+    '고도몰5': '고래미자사몰_현금영수증(고도몰)',
+    '스마트스토어': '스토어팜',
+    '배민상회': '주식회사 우아한형제들(배민상회)',
+    '이지웰몰': '주식회사 현대이지웰'
+}
+
+ECOUNT_COLUMNS = [
+    '일자', '순번', '거래처코드', '거래처명', '담당자', '출하창고', '거래유형', '통화', '환율',
+    '적요_전표', '미수금', '총합계', '연결전표', '품목코드', '품목명', '규격', '박스', '수량',
+    '단가', '외화금액', '공급가액', '부가세', '적요_품목', '생산전표생성', '시리얼/로트',
+    '관리항목', '쇼핑몰고객명'
+]
+
+CLIENT_SORT_ORDER = [
+    '고래미자사몰_현금영수증(고도몰)',
+    '스토어팜',
+    '쿠팡 주식회사',
+    '주식회사 우아한형제들(배민상회)',
+    '주식회사 현대이지웰'
+]
+
+# 상품명 분류: BOX 상품은 주문수량 × 마스터 입수량, '3개입'/'3개' 상품은 수량 3배
+BOX_PATTERN = re.compile('BOX')
+THREE_PACK_PATTERN = re.compile('3개입|3개')
+PRODUCT_NAME_CACHE_SIZE = 65536
+
+# 과세여부 → (거래유형, 공급가액 = 금액 / 나눔값). 그 밖의 값(미등록 상품 등)은 거래유형 11, 나눔값 1
+TAX_CLASSES = {'과세': (11, 1.1), '면세': (12, 1.0)}
+DEFAULT_TAX_CLASS = (11, 1.0)
+
+
+@lru_cache(maxsize=PRODUCT_NAME_CACHE_SIZE)
+def classify_product_name(name):
+    """상품명 → (BOX 여부, 입수 배수)."""
+    return BOX_PATTERN.search(name) is not None, 3 if THREE_PACK_PATTERN.search(name) else 1
+
+
+def _per_category(values, classify, missing):
+    """범주마다 classify를 한 번 불러 행별 결과 배열(열마다 하나)을 만듭니다. 결측값은 missing입니다."""
+    values = values.astype('category')
+    table = [classify(category) for category in values.cat.categories] + [missing]
+    # 범주 코드 -1(결측)은 표의 마지막 줄을 가리킵니다
+    return [np.asarray(column)[values.cat.codes.to_numpy()] for column in zip(*table)]
+
+
+def _map_categories(values, mapping):
+    """values를 범주형으로 바꾼 뒤 범주 이름만 mapping으로 바꿉니다 (mapping에 없는 값은 그대로).
+
+    행마다 문자열을 새로 만들지 않고 범주 수만큼만 계산합니다.
+    """
+    values = values.astype('category')
+    new_codes, new_categories = pd.factorize(values.cat.categories.map(lambda name: mapping.get(name, name)))
+    codes = values.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, new_codes[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=new_categories), index=values.index)
+
+
+def _float_values(values, fill):
+    """숫자 열을 float 배열로 꺼냅니다 (결측값은 fill). 숫자형이 아닌 열만 to_numeric으로 바꿉니다."""
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors='coerce')
+    return values.to_numpy(dtype=float, na_value=fill)
+
+
+def compute_ecount_values(df_merged):
+    """마스터가 붙은 주문 행에서 이카운트 행의 계산 값(거래처명, 거래유형, 박스, 수량, 공급가액, 부가세)을 구합니다."""
+    is_box, pack_multiplier = _per_category(df_merged['SKU상품명'], lambda name: classify_product_name(str(name)), (False, 1))
+    transaction_type, supply_divisor = _per_category(df_merged['과세여부'], lambda tax: TAX_CLASSES.get(tax, DEFAULT_TAX_CLASS), DEFAULT_TAX_CLASS)
+
+    quantity = df_merged['주문수량'].to_numpy()
+    units = _float_values(df_merged['입수량'], 1)
+    amount = _float_values(df_merged['실결제금액'], 0)
+    supply = amount / supply_divisor
+    return pd.DataFrame({
+        '거래처명': _map_categories(df_merged['쇼핑몰'], CLIENT_MAP),
+        '거래유형': transaction_type.astype(np.int8),
+        '박스': np.where(is_box, quantity, np.nan),
+        '수량': (quantity * np.where(is_box, units, 1) * pack_multiplier).astype(np.int32),
+        '공급가액': supply,
+        '부가세': amount - supply,
+    }, index=df_merged.index)
+
+
+def _constant_column(value, n_rows):
+    # 모든 행이 같은 값인 열은 범주 하나짜리 범주형으로 만들어 행마다 문자열을 두지 않습니다
+    return pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), categories=[value])
+
+
+def ecount_sort_keys(df):
+    """이카운트 업로드 정렬 키 (거래처 순위, 거래유형). CLIENT_SORT_ORDER에 없는 거래처는 맨 뒤 순위입니다."""
+    client_rank = pd.Categorical(df['거래처명'], categories=CLIENT_SORT_ORDER, ordered=True).codes.astype(np.int64)
+    client_rank[client_rank < 0] = len(CLIENT_SORT_ORDER)
+    return client_rank, pd.to_numeric(df['거래유형']).to_numpy().astype(np.int8)
+
+
+def layout_ecount_upload(df_lines):
+    """계산 값이 붙은 주문 행을 이카운트 업로드 양식(ECOUNT_COLUMNS)으로 만들고 거래처, 거래유형 순으로 정렬합니다.
+
+    정렬 순서를 먼저 구한 뒤 필요한 열만 그 순서로 꺼내므로, 양식 전체를 만든 뒤 다시 정렬해 복사하지 않습니다.
+    공급가액, 부가세는 결측값이 없으므로 반올림한 int64로 바로 만듭니다.
+    """
+    # 거래처 순서(CLIENT_SORT_ORDER에 없는 거래처는 맨 뒤) → 거래유형 → 원래 순서
+    client_rank, transaction_types = ecount_sort_keys(df_lines)
+    order = np.lexsort((df_lines['original_order'].to_numpy(), transaction_types, client_rank))
+
+    n_rows = len(df_lines)
+    columns = {
+        '거래처명': df_lines['거래처명'].array.take(order),
+        '출하창고': _constant_column('고래미', n_rows),
+        '거래유형': transaction_types[order],
+        '적요_전표': _constant_column('오전/온라인', n_rows),
+        '품목코드': df_lines['재고관리코드'].array.take(order),
+        '박스': df_lines['박스'].to_numpy(dtype=float)[order],
+        '수량': df_lines['수량'].to_numpy(dtype=np.int32)[order],
+        '공급가액': np.round(df_lines['공급가액'].to_numpy(dtype=float)[order]).astype(np.int64),
+        '부가세': np.round(df_lines['부가세'].to_numpy(dtype=float)[order]).astype(np.int64),
+        '쇼핑몰고객명': df_lines['수령자명'].array.take(order),
+    }
+    blank = _constant_column('', n_rows)
+    return pd.DataFrame(
+        {col: columns[col] if col in columns else blank for col in ECOUNT_COLUMNS},
+        index=df_lines.index[order],
+    )
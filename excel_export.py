@@ -0,0 +1,222 @@
+import io
+from copy import copy
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Border, Side, Alignment
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+
+from cache_utils import BytesLRUCache, hash_dataframe
+
+# --------------------------------------------------------------------------
+# 스트리밍 엑셀 내보내기 엔진
+# --------------------------------------------------------------------------
+# df.to_excel → load_workbook → 셀 순회 서식 적용 방식 대신, write-only 워크북에
+# 미리 만들어 둔 서식을 입혀 한 번에 행을 흘려 씁니다. 메모리는 행 수와 무관하게 일정합니다.
+
+SHEET_NAME = 'Sheet1'
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+CENTER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+THIN_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+PINK_FILL = PatternFill(start_color="FFEBEE", end_color="FFEBEE", fill_type="solid") # 연한 핑크
+
+ECOUNT_RENAME = {'적요_전표': '적요', '적요_품목': '적요.1'}
+
+# 열 너비 계산에서 2칸으로 셀 전각 문자 (한글, 한자, 가나, 전각 기호)
+WIDE_CHAR_PATTERN = '[\u1100-\u115F\u2E80-\u303E\u3041-\u33FF\u3400-\u4DBF\u4E00-\u9FFF\uA960-\uA97F\uAC00-\uD7A3\uF900-\uFAFF\uFE30-\uFE4F\uFF00-\uFF60\uFFE0-\uFFE6]'
+# 이보다 행이 많은 파일은 표본 행으로 열 너비를 추정합니다
+WIDTH_SAMPLE_ROWS = 100000
+
+# 만들어 둔 엑셀 bytes를 (데이터 해시, format_type)별로 보관합니다. 프로세스 전체에서 공유됩니다.
+EXCEL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_excel_cache = BytesLRUCache(EXCEL_CACHE_MAX_BYTES)
+
+
+def _build_styles(sheet):
+    """서식 조합별 StyleArray를 미리 만들어 둡니다. 셀마다 서식 객체를 새로 등록하지 않기 위함입니다."""
+    def make(border=None, fill=None):
+        cell = WriteOnlyCell(sheet)
+        cell.alignment = CENTER_ALIGNMENT
+        if border is not None:
+            cell.border = border
+        if fill is not None:
+            cell.fill = fill
+        return cell._style
+
+    return {
+        'plain': make(),
+        'border': make(border=THIN_BORDER),
+        'border_pink': make(border=THIN_BORDER, fill=PINK_FILL),
+    }
+
+
+def _styled_cell(sheet, value, style):
+    cell = WriteOnlyCell(sheet, value=None if value == '' else value)
+    cell._style = copy(style)
+    return cell
+
+
+def _display_widths(values):
+    """값마다 엑셀에 보이는 글자 폭을 구합니다. 한글 등 전각 문자는 2칸으로 셉니다."""
+    strings = values.astype(str)
+    # 엑셀은 3.0을 3으로 저장하므로 정수값 실수는 정수 문자열 길이로 셉니다
+    if pd.api.types.is_float_dtype(values):
+        integral = values % 1 == 0
+        strings = strings.where(~integral, values[integral].astype('int64').astype(str))
+    widths = strings.str.len() + strings.str.count(WIDE_CHAR_PATTERN)
+    # 빈 값은 엑셀에서 빈 칸이므로 너비에 넣지 않습니다
+    return widths.where(values.notna(), 0)
+
+
+def _column_widths(df, sample_rows=None):
+    """헤더를 포함한 각 열의 최대 표시 폭으로 열 너비를 계산합니다.
+
+    결측값을 채우기 전의 데이터프레임을 받아 열 dtype 그대로 벡터 연산합니다.
+    sample_rows보다 행이 많으면 무작위로 뽑은 sample_rows개 행만으로 추정합니다.
+    """
+    if sample_rows is not None and len(df) > sample_rows:
+        df = df.sample(n=sample_rows, random_state=0)
+    header_widths = _display_widths(pd.Series(df.columns, dtype=object)).tolist()
+    widths = []
+    for header_width, col_idx in zip(header_widths, range(df.shape[1])):
+        values = df.iloc[:, col_idx]
+        max_length = max(header_width, int(_display_widths(values).max())) if len(values) else header_width
+        widths.append((max_length + 2) * 1.2)
+    return widths
+
+
+def _packing_list_layout(bundle_values, continues=False):
+    """묶음번호 열로 묶음 경계와 홀짝을 한 번에 계산합니다.
+
+    반환값: (묶음 첫 행 여부, 묶음 시작 인덱스, 묶음별 음영 여부)
+    묶음번호는 묶음 첫 행에만 있고 나머지 행은 빈 값입니다. 홀수 번호 묶음에 음영을 넣습니다.
+    continues=True이면 첫 행들이 앞 묶음(이전 묶음 행)의 이어지는 행일 수 있으므로 첫 행을 시작으로 고치지 않습니다.
+    """
+    labels = pd.Series(bundle_values, dtype=object).astype(str)
+    is_start = ~labels.isin(['', '0']).to_numpy()
+    if len(bundle_values) and not continues:
+        is_start[0] = True
+
+    starts = np.flatnonzero(is_start)
+    start_labels = labels.iloc[starts]
+    bundle_nums = pd.to_numeric(start_labels.where(start_labels.str.isdigit()), errors='coerce').to_numpy()
+    return is_start, starts, bundle_nums % 2 == 1
+
+
+def _fill_blanks(df):
+    """빈 값을 ''로 채웁니다. 범주형 열은 '' 범주가 없으면 먼저 추가합니다 (fillna가 새 범주를 만들지 못함)."""
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and '' not in dtype.categories and df[col].hasnans:
+            df = df.assign(**{col: df[col].cat.add_categories([''])})
+    return df.fillna('')
+
+
+class ExcelStreamWriter:
+    """서식이 적용된 엑셀 파일을 데이터프레임 묶음 단위로 이어 씁니다.
+
+    write()를 여러 번 불러도 한 번에 쓴 것과 같은 파일이 되며, 포장 리스트의 묶음 병합과 음영,
+    출고수량 요약의 줄무늬는 묶음 경계를 넘어 이어집니다. 열 너비는 첫 write()(또는 width_sample)로 정합니다
+    (write-only 워크북은 행을 쓰기 전에 열 너비를 지정해야 함).
+    """
+
+    def __init__(self, format_type=None, width_sample=None, width_sample_rows=WIDTH_SAMPLE_ROWS):
+        self.format_type = format_type
+        self.width_sample = width_sample
+        self.width_sample_rows = width_sample_rows
+        self.n_rows = 0
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(SHEET_NAME)
+        self.styles = _build_styles(self.sheet)
+        bordered = format_type in ('packing_list', 'quantity_summary')
+        self.body_style = self.styles['border'] if bordered else self.styles['plain']
+        self._header_written = False
+        # 포장 리스트: 아직 끝나지 않은 마지막 묶음의 (시작 행 인덱스, 음영 여부)
+        self._open_bundle = None
+
+    def _rename(self, df):
+        return df.rename(columns=ECOUNT_RENAME) if self.format_type == 'ecount_upload' else df
+
+    def _write_header(self, df):
+        # 열 너비는 결측값을 채우기 전의 데이터프레임으로 계산합니다
+        sample = df if self.width_sample is None else self._rename(self.width_sample)
+        for col_idx, width in enumerate(_column_widths(sample, self.width_sample_rows), start=1):
+            self.sheet.column_dimensions[get_column_letter(col_idx)].width = width
+        self.sheet.append([_styled_cell(self.sheet, col, self.body_style) for col in df.columns])
+        self._header_written = True
+
+    def _merge_bundle(self, start, end):
+        # 데이터 인덱스 0 → 엑셀 2행. 묶음 구간은 서로 겹치지 않으므로 MultiCellRange.add의
+        # 중복 검사(구간 수의 제곱)를 건너뛰고 집합에 바로 넣습니다
+        if end > start:
+            self.sheet.merged_cells.ranges.update(
+                CellRange(min_col=col, min_row=start + 2, max_col=col, max_row=end + 2) for col in (1, 4)
+            )
+
+    def _packing_list_rows(self, bundle_values):
+        """(행별 음영, 병합된 나머지 행 여부). 끝난 묶음은 이 자리에서 병합합니다."""
+        n_rows = len(bundle_values)
+        is_start, starts, bundle_fill = _packing_list_layout(bundle_values, continues=self._open_bundle is not None)
+        global_starts = (starts + self.n_rows).tolist()
+        open_start, open_fill = self._open_bundle or (None, False)
+        # 첫 묶음 시작 전의 행은 앞에서 이어지는 묶음입니다
+        lengths = np.diff(np.append(starts, n_rows))
+        row_fill = np.concatenate([np.full(starts[0] if len(starts) else n_rows, open_fill), np.repeat(bundle_fill, lengths)])
+
+        bundle_starts = ([open_start] if open_start is not None else []) + global_starts
+        for start, next_start in zip(bundle_starts, bundle_starts[1:]):
+            self._merge_bundle(start, next_start - 1)
+        if global_starts:
+            self._open_bundle = (global_starts[-1], bool(bundle_fill[-1]))
+        return row_fill, ~is_start
+
+    def write(self, df):
+        df = self._rename(df)
+        if not self._header_written:
+            self._write_header(df)
+        df_to_save = _fill_blanks(df)
+
+        # 파일별 특수 서식: 행별 음영과 병합 구간을 쓰기 전에 한 번에 계산
+        row_fill = np.zeros(len(df_to_save), dtype=bool)
+        merged_tail = np.zeros(len(df_to_save), dtype=bool)
+        if self.format_type == 'packing_list' and len(df_to_save.columns) >= 4:
+            row_fill, merged_tail = self._packing_list_rows(df_to_save.iloc[:, 0].to_numpy())
+        elif self.format_type == 'quantity_summary':
+            row_fill = (np.arange(len(df_to_save)) + self.n_rows) % 2 == 0
+
+        styles, body_style, sheet = self.styles, self.body_style, self.sheet
+        for values, fill, tail in zip(df_to_save.itertuples(index=False, name=None), row_fill.tolist(), merged_tail.tolist()):
+            style = styles['border_pink'] if fill else body_style
+            if tail:
+                # 병합된 셀의 나머지 칸은 값 없이 서식만 남깁니다
+                values = ('',) + values[1:3] + ('',) + values[4:]
+            sheet.append([_styled_cell(sheet, value, style) for value in values])
+        self.n_rows += len(df_to_save)
+
+    def close(self, target=None):
+        """워크북을 target(경로 또는 파일 객체)에 저장합니다. target이 없으면 bytes를 돌려줍니다."""
+        if self._open_bundle is not None:
+            self._merge_bundle(self._open_bundle[0], self.n_rows - 1)
+            self._open_bundle = None
+        if target is not None:
+            self.workbook.save(target)
+            return None
+        output = io.BytesIO()
+        self.workbook.save(output)
+        return output.getvalue()
+
+
+def to_excel_formatted(df, format_type=None, width_sample_rows=WIDTH_SAMPLE_ROWS):
+    """데이터프레임을 서식이 적용된 엑셀 파일 형식의 bytes로 변환하는 함수"""
+    writer = ExcelStreamWriter(format_type, width_sample_rows=width_sample_rows)
+    writer.write(df)
+    return writer.close()
+
+
+def to_excel_cached(df, format_type=None):
+    """to_excel_formatted 결과를 캐시에서 꺼내거나, 없으면 만들어 캐시에 넣습니다."""
+    key = (hash_dataframe(df), format_type)
+    return _excel_cache.get_or_build(key, lambda: to_excel_formatted(df, format_type=format_type))
@@ -0,0 +1,488 @@
+import codecs
+import csv
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import posixpath
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+
+import pandas as pd
+
+import upload_cache
+from marketplaces import ADAPTERS
+
+try:
+    import python_calamine  # noqa: F401 (pandas의 calamine 엔진이 사용)
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# --------------------------------------------------------------------------
+# 파일별 필요한 열 (열 선택 읽기)
+# --------------------------------------------------------------------------
+# 파이프라인이 실제로 쓰는 열만 읽어 파싱 후 데이터프레임 크기와 메모리를 줄입니다.
+# 쇼핑몰 가격표 파일의 열은 어댑터(marketplaces.ADAPTERS)의 선언에서 가져오며, 별칭도 함께 읽어 둡니다.
+
+SLOT_COLUMNS = {
+    'ecount': ['재고관리코드', 'SKU상품명', '주문수량', '금액', '쇼핑몰', '수령자명'],
+    **{slot: adapter.read_columns for slot, adapter in ADAPTERS.items()},
+}
+
+# --------------------------------------------------------------------------
+# 열 타입 계획 (메모리 절약)
+# --------------------------------------------------------------------------
+# 읽은 직후 반복되는 문자열(쇼핑몰, 상품명)은 범주형, 수량은 int32, 금액은 int64로 바꿔
+# 이후 단계의 모든 데이터프레임이 이 타입을 그대로 이어받게 합니다.
+# 숫자로 읽을 수 없는 값은 0으로 둡니다 (기존 pd.to_numeric(..., errors='coerce').fillna(0)과 같음).
+# 쇼핑몰 가격표 파일의 타입은 어댑터의 dtypes 선언에서 가져옵니다.
+
+SLOT_DTYPES = {
+    'ecount': {'쇼핑몰': 'category', 'SKU상품명': 'category', '주문수량': 'int32', '금액': 'int64'},
+    **{slot: adapter.dtypes for slot, adapter in ADAPTERS.items()},
+}
+
+
+def apply_dtypes(df, dtypes):
+    """dtypes({열: 타입})를 df에 적용합니다. 없는 열은 건너뜁니다."""
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(dtype)
+    return df
+
+# --------------------------------------------------------------------------
+# 파일 형식별 읽기 함수
+# --------------------------------------------------------------------------
+
+# 읽기 함수의 data는 업로드 bytes이거나 파일 경로(upload_store.SpilledUpload 포함)입니다.
+# 경로이면 파일 전체를 bytes로 올리지 않고 읽기 엔진이 파일에서 직접 읽습니다 (CSV는 메모리 매핑).
+
+def _is_path(data):
+    return isinstance(data, (str, os.PathLike))
+
+
+def _source(data):
+    """pandas/openpyxl 읽기 함수에 넘길 값: 경로는 그대로, bytes는 BytesIO."""
+    return os.fspath(data) if _is_path(data) else io.BytesIO(data)
+
+
+def upload_source(file):
+    """업로드 파일에서 읽기 함수에 넘길 data: 경로(디스크에 옮긴 업로드 포함)는 그대로, 파일 객체는 getvalue()."""
+    return file if _is_path(file) else file.getvalue()
+
+
+def content_digest(data):
+    """data 내용의 SHA-256 (hex). 디스크에 옮긴 업로드는 옮길 때 계산한 값을 씁니다."""
+    if getattr(data, 'sha256', None):
+        return data.sha256
+    if not _is_path(data):
+        return hashlib.sha256(data).hexdigest()
+    hasher = hashlib.sha256()
+    with open(data, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def detect_file_format(data):
+    """파일 앞부분(매직 바이트)으로 형식을 판별합니다. 확장자는 믿지 않습니다."""
+    if _is_path(data):
+        with open(data, 'rb') as f:
+            data = f.read(8)
+    if data[:4] == b'PK\x03\x04':
+        return 'xlsx'
+    if data[:8] == b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1':
+        return 'xls'
+    return 'csv'
+
+
+def _read_excel(data, usecols):
+    return pd.read_excel(_source(data), engine=EXCEL_ENGINE, usecols=usecols)
+
+
+def _read_xls(data, usecols):
+    # openpyxl은 xls를 읽지 못하므로 엔진을 pandas 기본 선택에 맡깁니다
+    engine = 'calamine' if EXCEL_ENGINE == 'calamine' else None
+    return pd.read_excel(_source(data), engine=engine, usecols=usecols)
+
+
+def _read_csv(data, usecols):
+    # 쇼핑몰 CSV는 UTF-8(BOM)과 CP949가 섞여 있습니다
+    try:
+        return pd.read_csv(_source(data), usecols=usecols, encoding='utf-8-sig', memory_map=_is_path(data))
+    except UnicodeDecodeError:
+        return pd.read_csv(_source(data), usecols=usecols, encoding='cp949', memory_map=_is_path(data))
+
+
+READERS = {
+    'xlsx': _read_excel,
+    'xls': _read_xls,
+    'csv': _read_csv,
+}
+
+
+def read_upload(data, slot=None):
+    """업로드 bytes를 형식에 맞는 읽기 함수로 읽습니다. slot을 주면 그 파일에 필요한 열만 읽고 SLOT_DTYPES를 적용합니다."""
+    usecols = None
+    if slot in SLOT_COLUMNS:
+        wanted = set(SLOT_COLUMNS[slot])
+        usecols = lambda name: str(name).strip() in wanted
+    df = READERS[detect_file_format(data)](data, usecols)
+    df.columns = [str(col).strip() for col in df.columns]
+    return apply_dtypes(df, SLOT_DTYPES.get(slot, {}))
+
+# --------------------------------------------------------------------------
+# 머리글 행만 읽기 (파일 검사)
+# --------------------------------------------------------------------------
+# 파일 전체를 파싱하기 전에 열 이름만 확인하려고 첫 행만 읽습니다 (큰 파일도 수 밀리초).
+# xlsx는 압축 파일 안의 첫 시트 XML을 첫 행이 끝날 때까지만 흘려 읽고, 공유 문자열도 필요한 번호까지만 읽습니다.
+# csv는 첫 줄만 읽고, xls는 pandas로 열 이름만 읽습니다 (nrows=0).
+
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_XLSX_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_XLSX_SHARED_STRINGS_TYPE = '/sharedStrings'
+HEADER_MAX_BYTES = 1 << 20
+
+
+def _xlsx_part(target):
+    # 관계 파일의 대상 경로는 xl/ 기준 상대 경로이거나 / 로 시작하는 압축 파일 기준 경로입니다
+    return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+
+def _xlsx_workbook_parts(archive):
+    """(첫 시트 XML 경로, 공유 문자열 XML 경로 또는 None)."""
+    relationships = {rel.get('Id'): rel for rel in ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))}
+    sheet = ElementTree.fromstring(archive.read('xl/workbook.xml')).find(f'{_XLSX_NS}sheets/{_XLSX_NS}sheet')
+    sheet_part = _xlsx_part(relationships[sheet.get(f'{_XLSX_REL_NS}id')].get('Target'))
+    shared = next((rel for rel in relationships.values() if rel.get('Type', '').endswith(_XLSX_SHARED_STRINGS_TYPE)), None)
+    return sheet_part, _xlsx_part(shared.get('Target')) if shared is not None else None
+
+
+def _xlsx_column_index(reference):
+    """셀 참조('AB1')의 열 번호 (0부터)."""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def _xlsx_text(element):
+    # 서식 있는 문자열(<r>)은 조각을 이어 붙이고, 윗주(<rPh>)는 뺍니다
+    parts = [child.text or '' for child in element if child.tag == f'{_XLSX_NS}t']
+    parts += [run.findtext(f'{_XLSX_NS}t', '') for run in element if run.tag == f'{_XLSX_NS}r']
+    return ''.join(parts)
+
+
+def _xlsx_first_row(archive, sheet_part):
+    """첫 시트에서 값이 있는 첫 행의 {열 번호: (셀 타입, 값 문자열)}."""
+    with archive.open(sheet_part) as stream:
+        for _, element in ElementTree.iterparse(stream):
+            if element.tag != f'{_XLSX_NS}row':
+                continue
+            cells = {}
+            for position, cell in enumerate(element.iter(f'{_XLSX_NS}c')):
+                kind = cell.get('t', 'n')
+                if kind == 'inlineStr':
+                    inline = cell.find(f'{_XLSX_NS}is')
+                    value = _xlsx_text(inline) if inline is not None else None
+                else:
+                    value = cell.findtext(f'{_XLSX_NS}v')
+                if value is not None:
+                    reference = cell.get('r')
+                    cells[_xlsx_column_index(reference) if reference else position] = (kind, value)
+            if cells:
+                return cells
+            element.clear()
+    return {}
+
+
+def _xlsx_shared_strings(archive, part, wanted):
+    """공유 문자열 중 wanted 번호들만 {번호: 문자열}로 읽습니다. 가장 큰 번호까지 읽으면 멈춥니다."""
+    strings = {}
+    if not wanted or part is None:
+        return strings
+    last = max(wanted)
+    with archive.open(part) as stream:
+        index = 0
+        for _, element in ElementTree.iterparse(stream):
+            if element.tag != f'{_XLSX_NS}si':
+                continue
+            if index in wanted:
+                strings[index] = _xlsx_text(element)
+            if index >= last:
+                break
+            index += 1
+            element.clear()
+    return strings
+
+
+def _xlsx_header(data):
+    with zipfile.ZipFile(_source(data)) as archive:
+        sheet_part, shared_part = _xlsx_workbook_parts(archive)
+        cells = _xlsx_first_row(archive, sheet_part)
+        shared = _xlsx_shared_strings(archive, shared_part, {int(value) for kind, value in cells.values() if kind == 's'})
+    names = [None] * (max(cells) + 1 if cells else 0)
+    for index, (kind, value) in cells.items():
+        names[index] = shared.get(int(value)) if kind == 's' else value
+    return names
+
+
+def _csv_header(data):
+    if _is_path(data):
+        with open(data, 'rb') as f:
+            head = f.read(HEADER_MAX_BYTES)
+    else:
+        head = bytes(memoryview(data)[:HEADER_MAX_BYTES])
+    line = head.split(b'\n', 1)[0]
+    for encoding in ('utf-8-sig', 'cp949'):
+        try:
+            text = line.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = line.decode('latin-1')
+    return next(csv.reader([text.rstrip('\r')]), [])
+
+
+def _xls_header(data):
+    engine = 'calamine' if EXCEL_ENGINE == 'calamine' else None
+    return list(pd.read_excel(_source(data), engine=engine, nrows=0).columns)
+
+
+HEADER_READERS = {
+    'xlsx': _xlsx_header,
+    'xls': _xls_header,
+    'csv': _csv_header,
+}
+
+
+def read_header(data):
+    """파일의 첫 행(열 이름 목록)만 읽습니다. 열 이름은 read_upload처럼 앞뒤 공백을 지우고, 빈 칸은 'Unnamed: 번호'입니다."""
+    file_format = detect_file_format(data)
+    try:
+        names = HEADER_READERS[file_format](data)
+    except (KeyError, AttributeError, ElementTree.ParseError):
+        # 표준과 다른 구조의 xlsx(다른 프로그램이 만든 파일 등)는 읽기 엔진으로 열 이름만 읽습니다
+        if file_format != 'xlsx':
+            raise
+        names = list(pd.read_excel(_source(data), engine=EXCEL_ENGINE, nrows=0).columns)
+    return [f"Unnamed: {i}" if name is None else str(name).strip() for i, name in enumerate(names)]
+
+# --------------------------------------------------------------------------
+# 묶음 단위 읽기 (스트리밍 처리)
+# --------------------------------------------------------------------------
+# 수십만 행 이상의 이카운트 파일을 한 번에 데이터프레임으로 만들지 않고 chunk_rows 행씩 읽습니다.
+# csv는 pandas의 chunksize, xlsx는 openpyxl read-only 모드로 행을 흘려 읽습니다.
+# xls는 흘려 읽을 수 없으므로 전체를 읽은 뒤 나눠 줍니다. 행 인덱스는 파일 전체 기준으로 이어집니다.
+
+CHUNK_ROWS = 100_000
+
+
+def _csv_encoding(data, block_size=1 << 20):
+    """UTF-8로 끝까지 읽을 수 있으면 'utf-8-sig', 아니면 'cp949'. 문자열 전체를 만들지 않고 블록별로 확인합니다."""
+    if _is_path(data):
+        # 파일은 메모리 매핑해 확인합니다 (빈 파일은 매핑할 수 없음)
+        if os.path.getsize(data) == 0:
+            return 'utf-8-sig'
+        with open(data, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return _csv_encoding(view, block_size)
+            finally:
+                # 매핑을 닫기 전에 내보낸 버퍼를 놓아야 합니다
+                view.release()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    view = memoryview(data)
+    try:
+        for start in range(0, len(view), block_size):
+            decoder.decode(view[start:start + block_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'cp949'
+    return 'utf-8-sig'
+
+
+def _iter_csv(data, usecols, chunk_rows):
+    with pd.read_csv(_source(data), usecols=usecols, encoding=_csv_encoding(data), chunksize=chunk_rows, memory_map=_is_path(data)) as reader:
+        yield from reader
+
+
+def _iter_excel(data, usecols, chunk_rows):
+    # openpyxl은 함수 안에서 import합니다 (읽기 엔진이 calamine이어도 스트리밍 읽기에는 openpyxl을 씀)
+    import openpyxl
+
+    # openpyxl은 경로의 확장자를 검사하므로 경로는 파일 객체로 열어 넘깁니다 (임시 파일에는 확장자가 없음)
+    source = open(data, 'rb') if _is_path(data) else io.BytesIO(data)
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        names = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+        keep = [i for i, name in enumerate(names) if usecols is None or usecols(name)]
+        batch, offset = [], 0
+        for row in rows:
+            # pandas read_excel처럼 빈 행은 건너뜁니다
+            if all(value is None for value in row):
+                continue
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=[names[i] for i in keep], index=pd.RangeIndex(offset, offset + len(batch)))
+                batch, offset = [], offset + len(batch)
+        if batch or not offset:
+            yield pd.DataFrame(batch, columns=[names[i] for i in keep], index=pd.RangeIndex(offset, offset + len(batch)))
+    finally:
+        workbook.close()
+        source.close()
+
+
+def _iter_xls(data, usecols, chunk_rows):
+    df = _read_xls(data, usecols)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+CHUNK_READERS = {
+    'xlsx': _iter_excel,
+    'xls': _iter_xls,
+    'csv': _iter_csv,
+}
+
+
+def iter_upload_chunks(data, slot=None, chunk_rows=CHUNK_ROWS):
+    """read_upload와 같은 열 선택, 열 이름 정리, SLOT_DTYPES를 적용한 데이터프레임을 chunk_rows 행씩 돌려줍니다.
+
+    빈 파일도 열 이름만 있는 데이터프레임을 하나 돌려줍니다.
+    """
+    usecols = None
+    if slot in SLOT_COLUMNS:
+        wanted = set(SLOT_COLUMNS[slot])
+        usecols = lambda name: str(name).strip() in wanted
+    for df in CHUNK_READERS[detect_file_format(data)](data, usecols, chunk_rows):
+        df.columns = [str(col).strip() for col in df.columns]
+        yield apply_dtypes(df, SLOT_DTYPES.get(slot, {}))
+
+# --------------------------------------------------------------------------
+# 업로드 파일 읽기 (병렬 수집)
+# --------------------------------------------------------------------------
+# openpyxl 파싱은 CPU를 쓰고 GIL을 잡고 있으므로 스레드가 아닌 프로세스 풀로 세 파일을 동시에 읽습니다.
+# 작업 함수는 Streamlit 스크립트가 아닌 이 모듈에 있어야 하위 프로세스에서 import할 수 있습니다.
+# 읽은 결과는 파일 내용 해시로 디스크 캐시(upload_cache)에 남겨, 같은 파일을 다시 올리면 파싱하지 않습니다.
+# 앱 서버는 여러 스레드(세션, 백그라운드 작업)가 돌고 있으므로 fork로 프로세스를 띄우지 않습니다. 다른 스레드가 잡고 있던
+# 잠금이 복사되어 하위 프로세스가 멈출 수 있기 때문입니다. forkserver(없는 환경에서는 spawn)로 띄웁니다.
+
+UPLOAD_SLOTS = ('smartstore', 'ecount', 'godomall')
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """프로세스 풀은 한 번 만들어 재사용합니다 (매 실행마다 프로세스를 띄우는 비용을 피하기 위함)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=min(len(UPLOAD_SLOTS), os.cpu_count() or 1), mp_context=multiprocessing.get_context(POOL_START_METHOD),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _parse_upload(data, slot, cache_key=None):
+    """업로드 bytes를 읽어 (데이터프레임, 걸린 시간)을 돌려줍니다. cache_key를 주면 결과를 디스크 캐시에 넣습니다.
+
+    하위 프로세스에서 실행됩니다.
+    """
+    started = time.perf_counter()
+    df = read_upload(data, slot)
+    if cache_key is not None:
+        upload_cache.store(cache_key, df)
+    return df, time.perf_counter() - started
+
+
+def _parallel_available(parallel):
+    return parallel and (os.cpu_count() or 1) > 1
+
+
+def _upload_cache_key(data, slot):
+    # 읽기 설정(열 선택, 타입, 엑셀 엔진)이 바뀌면 키도 바뀌어 예전 캐시를 쓰지 않습니다
+    if upload_cache.cache_dir() is None:
+        return None
+    return upload_cache.cache_key(content_digest(data), slot, [SLOT_COLUMNS.get(slot), SLOT_DTYPES.get(slot), EXCEL_ENGINE])
+
+
+def _parse_uploads(uploads, parallel):
+    """[(bytes, 슬롯)]을 읽어 {슬롯: (데이터프레임, 걸린 시간)}을 돌려줍니다.
+
+    디스크 캐시에 있는 파일은 파싱하지 않고 캐시에서 읽습니다. 나머지는 코어가 여럿이면 프로세스 풀에서 읽습니다.
+    """
+    results, misses = {}, []
+    for data, slot in uploads:
+        started = time.perf_counter()
+        key = _upload_cache_key(data, slot)
+        df = upload_cache.load(key) if key is not None else None
+        if df is not None:
+            results[slot] = (df, time.perf_counter() - started)
+        else:
+            misses.append((data, slot, key))
+
+    if not _parallel_available(parallel):
+        results.update((slot, _parse_upload(data, slot, key)) for data, slot, key in misses)
+    else:
+        try:
+            futures = {slot: _get_pool().submit(_parse_upload, data, slot, key) for data, slot, key in misses}
+            results.update((slot, future.result()) for slot, future in futures.items())
+        except BrokenProcessPool:
+            # 작업 프로세스가 죽었으면 풀을 버리고 이번 실행은 순서대로 읽습니다
+            _reset_pool()
+            results.update((slot, _parse_upload(data, slot, key)) for data, slot, key in misses)
+    return results
+
+
+def parse_upload(data, slot, parallel=True):
+    """파일 하나를 읽어 (데이터프레임, 걸린 시간)을 돌려줍니다 (디스크 캐시, 프로세스 풀 규칙은 read_order_files와 같음).
+
+    업로드되자마자 미리 읽어 두는 백그라운드 작업에서 씁니다.
+    """
+    return _parse_uploads([(data, slot)], parallel)[slot]
+
+
+def read_order_files(file1, file2, file3, parallel=True, parsed=None):
+    """스마트스토어, 이카운트, 고도몰 파일을 읽어 ((df1, df2, df3), 파일별 소요 시간 dict)를 돌려줍니다.
+
+    file1~3은 getvalue()가 있는 파일 객체이거나 파일 경로(디스크에 옮긴 업로드 포함)입니다.
+    xlsx, xls, csv를 모두 받으며 파일마다 필요한 열(SLOT_COLUMNS)만 읽습니다. 전에 읽은 적 있는 파일은
+    디스크 캐시(upload_cache)에서 읽습니다.
+    CPU 코어가 하나뿐이거나 parallel=False이면 프로세스를 띄우지 않고 순서대로 읽습니다.
+    parsed({슬롯: parse_upload 결과})에 있는 파일은 다시 읽지 않고 그 결과를 씁니다 (소요 시간도 그때 잰 값).
+    """
+    parsed = parsed or {}
+    # 미리 읽은 데이터프레임은 여러 실행이 함께 쓰므로 얕은 복사본을 넘깁니다 (이후 단계의 열 추가가 원본에 남지 않음)
+    results = {slot: (df.copy(deep=False), elapsed) for slot, (df, elapsed) in parsed.items()}
+    missing = [(upload_source(file), slot) for file, slot in zip((file1, file2, file3), UPLOAD_SLOTS) if slot not in results]
+    results.update(_parse_uploads(missing, parallel))
+
+    frames = tuple(results[slot][0] for slot in UPLOAD_SLOTS)
+    timings = {slot: results[slot][1] for slot in UPLOAD_SLOTS}
+    return frames, timings
@@ -0,0 +1,262 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import StageProfiler
+
+# --------------------------------------------------------------------------
+# 백그라운드 처리 작업
+# --------------------------------------------------------------------------
+# 앱의 버튼 처리기는 작업을 맡기고 작업 ID만 받아 바로 끝납니다. 작업은 스레드 풀에서 실행되고,
+# 앱은 다시 실행될 때마다 작업의 진행 단계(StageProfiler 기록)와 지금까지 나온 결과를 읽어 보여 줍니다.
+# 작업은 세션이 아니라 프로세스에 있으므로 브라우저 연결이 끊겨도 처리 결과가 남습니다.
+#
+# 같은 키(업로드 파일 내용 해시 등)의 작업을 다시 맡기면 새로 실행하지 않고 실행 중이거나 끝난 작업을 돌려줍니다.
+# 실패했거나 취소된 작업만 다시 실행합니다. 작업은 맡긴 횟수만큼 참조를 세고, release는 마지막 참조가 놓일 때만
+# 작업을 취소합니다 (여러 세션이 함께 쓰는 작업을 한 세션이 취소하지 않도록).
+#
+# 메모리 예산: 작업마다 예상 메모리(memory)를 받아, 예약된 메모리 합이 예산(MemoryBudget)을 넘지 않을 때만
+# 새 작업을 시작합니다. 실행 중인 작업이 없으면 예산보다 큰 작업도 혼자 실행합니다.
+# 작업이 끝난 뒤에도 결과로 메모리를 붙잡는 작업(미리 읽은 데이터프레임 등)은 job.retained_memory를 정해 두면
+# 작업이 보관 목록에서 버려질 때까지 그만큼을 예약해 둡니다. 여러 JobRunner가 MemoryBudget 하나를 함께 쓸 수 있습니다.
+
+logger = logging.getLogger(__name__)
+
+# 동시에 실행할 작업 수 (한 작업이 끝날 때까지 다른 사용자가 기다리지 않도록 2개)
+JOB_WORKERS = 2
+# 끝난 작업(결과 포함)을 보관할 개수. 넘으면 가장 오래전에 끝난 작업부터 버립니다
+FINISHED_JOBS_MAX_ENTRIES = 4
+
+def default_memory_budget(fraction=0.5, fallback=4 * 1024 * 1024 * 1024):
+    """물리 메모리의 fraction 비율(바이트). 물리 메모리 크기를 알 수 없는 환경(윈도우 등)에서는 fallback."""
+    try:
+        return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') * fraction)
+    except (AttributeError, ValueError, OSError):
+        return fallback
+
+
+class MemoryBudget:
+    """여러 작업(여러 JobRunner)이 함께 쓰는 메모리 예산. limit이 None이면 제한하지 않습니다."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.reserved = 0
+        self._running = 0
+        self._released = threading.Condition()
+
+    def _fits(self, memory):
+        # 실행 중인 작업이 없으면 예산보다 큰 작업도 실행합니다 (보관된 결과만 남아 있어도 영원히 기다리지 않도록)
+        return self.limit is None or self._running == 0 or self.reserved + memory <= self.limit
+
+    def acquire(self, memory, cancelled=lambda: False):
+        """memory를 예약할 수 있을 때까지 기다렸다가 예약합니다. 기다리는 중 cancelled()가 참이 되면 예약하지 않고 False."""
+        with self._released:
+            while not cancelled() and not self._fits(memory):
+                self._released.wait()
+            if cancelled():
+                return False
+            self.reserved += memory
+            self._running += 1
+            return True
+
+    def release(self, memory, retained=0):
+        """실행이 끝난 작업의 예약을 풉니다. retained만큼은 hold된 메모리로 남깁니다 (나중에 drop으로 풂)."""
+        with self._released:
+            self.reserved -= memory - retained
+            self._running -= 1
+            self._released.notify_all()
+
+    def drop(self, retained):
+        """release에서 남긴 메모리를 풉니다."""
+        if retained:
+            with self._released:
+                self.reserved -= retained
+                self._released.notify_all()
+
+    def wake(self):
+        """예산을 기다리는 작업들을 깨웁니다 (취소된 작업이 끝날 수 있도록)."""
+        with self._released:
+            self._released.notify_all()
+
+
+JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED = '대기 중', '처리 중', '완료', '실패', '취소'
+
+
+class Job:
+    """백그라운드 작업 하나. 작업 함수는 profiler.stage()로 단계를 기록하고 publish()로 결과를 하나씩 내놓습니다.
+
+    stages는 진행률 계산에 쓰는 예상 단계 이름 목록입니다 (최상위 단계만 셉니다).
+    작업 함수가 retained_memory(바이트)를 정하면 작업이 끝난 뒤 보관되는 동안 그만큼을 메모리 예산에 남겨 둡니다.
+    """
+
+    def __init__(self, key, stages=(), trace_memory=False, memory=0):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.memory = memory
+        self.retained_memory = 0
+        self.references = 0
+        self.stages = list(stages)
+        self.profiler = StageProfiler(trace_memory=trace_memory)
+        self.status = JOB_QUEUED
+        self.message = None
+        self.results = {}
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._future = None
+        self._finished_event = threading.Event()
+
+    def publish(self, name, value):
+        """작업 중 끝난 결과를 내놓습니다. 앱은 다음 실행에서 바로 보여 줄 수 있습니다."""
+        self.results[name] = value
+
+    @property
+    def finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+    def wait(self, timeout=None):
+        """작업이 끝날 때까지(완료, 실패, 취소) 기다립니다. 시간 안에 끝났으면 True."""
+        return self._finished_event.wait(timeout)
+
+    @property
+    def completed_stages(self):
+        return [record['stage'] for record in list(self.profiler.records) if record['parent'] is None]
+
+    @property
+    def progress(self):
+        """예상 단계 중 끝난 단계의 비율 (0~1). 끝난 작업은 1입니다."""
+        if self.finished or not self.stages:
+            return 1.0 if self.finished else 0.0
+        done = set(self.completed_stages)
+        return sum(stage in done for stage in self.stages) / len(self.stages)
+
+    @property
+    def current_stage(self):
+        """지금 실행 중인 단계 이름 (예상 단계 중 아직 끝나지 않은 첫 단계)."""
+        done = set(self.completed_stages)
+        return next((stage for stage in self.stages if stage not in done), None)
+
+    @property
+    def elapsed_seconds(self):
+        return (self.finished_at or time.time()) - self.submitted_at
+
+
+class JobRunner:
+    """스레드 풀에서 작업을 실행하고 작업 ID로 상태와 결과를 찾아 줍니다.
+
+    프로세스 안에서 하나만 만들어 여러 세션이 함께 씁니다 (앱에서는 st.cache_resource).
+    memory_budget은 바이트 수(이 JobRunner만의 예산)나 다른 JobRunner와 함께 쓰는 MemoryBudget입니다.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_finished=FINISHED_JOBS_MAX_ENTRIES, memory_budget=None):
+        self.max_finished = max_finished
+        self.memory_budget = memory_budget if isinstance(memory_budget, MemoryBudget) else MemoryBudget(memory_budget)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, stages=(), trace_memory=False, memory=0, after=()):
+        """func(job)을 백그라운드에서 실행하고 작업 ID를 돌려줍니다. memory는 작업의 예상 메모리(바이트)입니다.
+
+        같은 key의 작업이 실행 중이거나 끝나 있으면 그 작업의 ID를 돌려줍니다 (실패했거나 취소된 작업은 새로 실행).
+        func가 예외를 내면 작업은 실패하고 예외 메시지가 job.message가 됩니다.
+        after의 작업(Job)들이 끝날 때까지는 메모리를 예약하지 않고 기다립니다. 예약한 채로 같은 예산의
+        다른 작업을 기다리면 그 작업이 예산을 얻지 못해 서로 기다릴 수 있기 때문입니다.
+        """
+        with self._lock:
+            job_id = self._by_key.get(key)
+            if job_id is not None and self._jobs[job_id].status not in (JOB_FAILED, JOB_CANCELLED):
+                self._jobs[job_id].references += 1
+                return job_id
+            job = Job(key, stages, trace_memory, memory)
+            job.references = 1
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+        job._future = self._executor.submit(self._run, job, func, after)
+        return job.id
+
+    def get(self, job_id):
+        """작업 ID의 Job. 없거나 보관 기간이 지나 버려졌으면 None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """끝나지 않은 작업을 취소합니다. 아직 시작하지 않았으면 실행하지 않고, 실행 중이면 끝난 뒤 결과를 버립니다.
+
+        스레드는 중간에 멈출 수 없으므로 실행 중인 작업은 끝까지 돌지만 결과를 쓰지 않습니다.
+        """
+        self._cancel(job_id, release=False)
+
+    def release(self, job_id):
+        """submit으로 얻은 작업 참조 하나를 놓습니다. 끝나지 않은 작업의 마지막 참조였으면 작업을 취소합니다."""
+        self._cancel(job_id, release=True)
+
+    def _cancel(self, job_id, release):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            if release:
+                job.references -= 1
+                if job.references > 0:
+                    return
+            job.status = JOB_CANCELLED
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+        # 메모리 여유를 기다리던 작업이면 깨워서 끝나게 합니다
+        self.memory_budget.wake()
+        if job._future is not None and job._future.cancel():
+            self._finish(job)
+
+    def _run(self, job, func, after):
+        for other in after:
+            other.wait()
+        if not self.memory_budget.acquire(job.memory, lambda: job.status == JOB_CANCELLED):
+            self._finish(job)
+            return
+        with self._lock:
+            cancelled = job.status == JOB_CANCELLED
+            if not cancelled:
+                job.status = JOB_RUNNING
+        if cancelled:
+            self.memory_budget.release(job.memory)
+            self._finish(job)
+            return
+        try:
+            func(job)
+            status = JOB_DONE
+        except Exception as e:
+            logger.exception("백그라운드 작업이 실패했습니다")
+            job.message = str(e)
+            status = JOB_FAILED
+        with self._lock:
+            if job.status == JOB_CANCELLED:
+                job.results = {}
+            else:
+                job.status = status
+            if job.status != JOB_DONE:
+                job.retained_memory = 0
+        self.memory_budget.release(job.memory, job.retained_memory)
+        self._finish(job)
+
+    def _finish(self, job):
+        job.finished_at = time.time()
+        job._finished_event.set()
+        self._forget_old_jobs()
+
+    def _forget_old_jobs(self):
+        with self._lock:
+            # 취소됐지만 아직 스레드가 돌고 있는 작업(finished_at 없음)은 끝날 때까지 남겨 둡니다
+            finished = [job for job in self._jobs.values() if job.finished_at is not None]
+            finished.sort(key=lambda job: job.finished_at)
+            forgotten = finished[:max(len(finished) - self.max_finished, 0)]
+            for job in forgotten:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) == job.id:
+                    del self._by_key[job.key]
+        for job in forgotten:
+            self.memory_budget.drop(job.retained_memory)
@@ -1 +1,251 @@
+"""주문 처리 자동화 배치 실행 (Streamlit 없이 실행)
 
+사용법:
+    # 하루치 파일 3개를 직접 지정
+    python main.py --smartstore 스마트스토어.xlsx --ecount 이카운트.xlsx --godomall 고도몰.xlsx -o output
+
+    # 날짜별 하위 폴더(각 폴더에 파일 3개)를 한 번에 처리
+    python main.py --input-dir daily_exports -o output --jobs 4
+
+    # 하루에 여러 번 실행: 이미 처리한 주문 행은 상태 저장소의 계산 결과를 다시 씀
+    python main.py --smartstore ... --ecount ... --godomall ... --incremental
+
+    # 단계별 시간/행 수/메모리를 JSON lines로 누적 기록 ('-'이면 표준 출력)
+    python main.py --input-dir daily_exports --profile-log profile.jsonl --profile-memory
+
+    # 월말 일괄 재처리: 수십만 행 이카운트 파일을 10만 행씩 나눠 처리하며 엑셀에 바로 씀
+    python main.py --smartstore ... --ecount ... --godomall ... --stream --chunk-rows 100000
+
+날짜 폴더 안의 파일은 파일 이름으로 구분합니다 (스마트스토어/smartstore, 이카운트/ecount, 고도몰/godomall).
+이름으로 구분할 수 없는 파일은 머리글 행(열 이름)으로 어느 쇼핑몰 파일인지 판별합니다.
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from excel_export import to_excel_formatted
+from ingest import CHUNK_ROWS, UPLOAD_SLOTS, read_header
+from master_store import get_master_store
+from order_state import OrderStateStore, normalize_business_date
+from profiling import StageProfiler
+from refine_pipeline import process_all_files
+from streaming import STREAM_OUTPUTS, stream_all_files
+from upload_schema import detect_slots
+
+logger = logging.getLogger(__name__)
+
+# 파일 이름에 들어 있는 단어로 어느 주문 파일인지 구분합니다
+SLOT_KEYWORDS = {
+    'smartstore': ('스마트스토어', 'smartstore'),
+    'ecount': ('이카운트', 'ecount'),
+    'godomall': ('고도몰', 'godomall'),
+}
+INPUT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+# 출력 파일 이름 앞부분과 format_type (앱의 다운로드 파일과 같음)
+OUTPUT_FILES = [
+    ('이카운트_업로드용', 'ecount_upload'),
+    ('물류팀_전달용_포장리스트', 'packing_list'),
+    ('물류팀_전달용_출고수량', 'quantity_summary'),
+    ('최종_실결제금액_보정완료', None),
+]
+
+
+def _header_slots(path):
+    """머리글 행으로 판별한 파일의 슬롯 목록. 읽을 수 없는 파일은 빈 목록."""
+    try:
+        return detect_slots(read_header(path))
+    except Exception:
+        logger.warning("%s: 머리글 행을 읽을 수 없습니다", path, exc_info=True)
+        return []
+
+
+def find_day_inputs(day_dir):
+    """날짜 폴더에서 슬롯별 입력 파일 경로를 찾습니다. 하나라도 없거나 여러 개면 ValueError.
+
+    파일 이름으로 구분하지 못한 슬롯은 이름으로 정해지지 않은 파일들의 머리글 행(열 이름)으로 찾습니다.
+    """
+    names = sorted(name for name in os.listdir(day_dir) if name.lower().endswith(INPUT_EXTENSIONS) and not name.startswith('~$'))
+    matches = {slot: [name for name in names if any(keyword in name.lower() for keyword in SLOT_KEYWORDS[slot])] for slot in UPLOAD_SLOTS}
+    paths = {slot: os.path.join(day_dir, found[0]) for slot, found in matches.items() if len(found) == 1}
+    unresolved = [slot for slot in UPLOAD_SLOTS if slot not in paths]
+    if unresolved:
+        claimed = {os.path.basename(path) for path in paths.values()}
+        detected = {name: _header_slots(os.path.join(day_dir, name)) for name in names if name not in claimed}
+        for slot in unresolved:
+            found = [name for name, slots in detected.items() if slot in slots]
+            if len(found) != 1:
+                raise ValueError(f"{day_dir}: '{slot}' 파일을 하나로 특정할 수 없습니다 (이름으로 찾은 파일: {matches[slot]}, 열 이름으로 찾은 파일: {found})")
+            paths[slot] = os.path.join(day_dir, found[0])
+    return paths
+
+
+def run_day(name, paths, master_path, output_dir, parallel_read=True, state_path=None, business_date=None, trace_memory=False,
+            chunk_rows=None):
+    """하루치 파일을 처리해 출력 폴더에 엑셀 파일을 씁니다. (이름, 성공 여부, 메시지, 성능 기록 JSON lines)를 돌려줍니다.
+
+    state_path를 주면 그 상태 저장소로 증분 처리합니다 (business_date: YYYYMMDD 등 날짜 문자열, 기본값 오늘).
+    chunk_rows를 주면 이카운트 파일을 그 행 수씩 나눠 처리하는 스트리밍 모드로 실행합니다 (증분 처리와 함께 쓸 수 없음).
+    """
+    if chunk_rows:
+        return run_day_streaming(name, paths, master_path, output_dir, chunk_rows, trace_memory)
+    profiler = StageProfiler(trace_memory=trace_memory)
+    # 파일 내용을 메모리에 올리지 않고 경로를 넘겨 읽기 함수가 파일에서 직접 읽게 합니다
+    files = [paths[slot] for slot in UPLOAD_SLOTS]
+
+    master = get_master_store(master_path)
+    state_store = OrderStateStore(state_path) if state_path else None
+    df_main, df_qty, df_pack, df_ecount, df_payment, success, message, df_issues = process_all_files(
+        *files, master, parallel_read=parallel_read, state_store=state_store, business_date=business_date, profiler=profiler
+    )
+    if not success:
+        return name, False, message, profiler.to_json_lines(run=name, success=False)
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    outputs = dict(zip(OUTPUT_FILES, [df_ecount, df_pack, df_qty, df_main]))
+    if not df_issues.empty:
+        outputs[('확인필요항목', None)] = df_issues
+    if not df_payment.empty:
+        outputs[('고도몰_결제금액_불일치', None)] = df_payment
+
+    for (prefix, format_type), df in outputs.items():
+        with profiler.stage(f"내보내기: {prefix}", len(df)):
+            data = to_excel_formatted(df, format_type=format_type)
+        with open(os.path.join(output_dir, f"{prefix}_{timestamp}.xlsx"), 'wb') as f:
+            f.write(data)
+
+    message = f"{message} (확인 필요 항목 {len(df_issues):,}건, {profiler.total_seconds:.1f}초)"
+    return name, True, message, profiler.to_json_lines(run=name, success=True)
+
+
+def run_day_streaming(name, paths, master_path, output_dir, chunk_rows, trace_memory=False):
+    """run_day의 스트리밍 모드: 결과 엑셀 파일을 묶음 단위로 출력 폴더에 바로 씁니다."""
+    profiler = StageProfiler(trace_memory=trace_memory)
+    # 파일 내용을 메모리에 올리지 않고 경로를 넘겨 읽기 함수가 파일에서 직접 읽게 합니다
+    files = [paths[slot] for slot in UPLOAD_SLOTS]
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    targets = {key: os.path.join(output_dir, f"{prefix}_{timestamp}.xlsx") for (prefix, _), key in zip(OUTPUT_FILES, STREAM_OUTPUTS)}
+    _, _, df_payment, success, message, df_issues = stream_all_files(
+        *files, get_master_store(master_path), targets, chunk_rows=chunk_rows, profiler=profiler
+    )
+    if not success:
+        return name, False, message, profiler.to_json_lines(run=name, success=False)
+
+    outputs = {}
+    if not df_issues.empty:
+        outputs['확인필요항목'] = df_issues
+    if not df_payment.empty:
+        outputs['고도몰_결제금액_불일치'] = df_payment
+    for prefix, df in outputs.items():
+        with profiler.stage(f"내보내기: {prefix}", len(df)):
+            data = to_excel_formatted(df)
+        with open(os.path.join(output_dir, f"{prefix}_{timestamp}.xlsx"), 'wb') as f:
+            f.write(data)
+
+    message = f"{message} (확인 필요 항목 {len(df_issues):,}건, {profiler.total_seconds:.1f}초)"
+    return name, True, message, profiler.to_json_lines(run=name, success=True)
+
+
+def build_jobs(args):
+    """(이름, 입력 경로 dict, 출력 폴더) 목록을 만듭니다."""
+    if args.input_dir:
+        jobs = []
+        for day in sorted(os.listdir(args.input_dir)):
+            day_dir = os.path.join(args.input_dir, day)
+            if os.path.isdir(day_dir):
+                jobs.append((day, find_day_inputs(day_dir), os.path.join(args.output_dir, day)))
+        return jobs
+    return [('single', {'smartstore': args.smartstore, 'ecount': args.ecount, 'godomall': args.godomall}, args.output_dir)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--smartstore', help='스마트스토어 파일 (금액확인용)')
+    parser.add_argument('--ecount', help='이카운트 다운로드 파일 (주문목록)')
+    parser.add_argument('--godomall', help='고도몰 파일 (금액확인용)')
+    parser.add_argument('--input-dir', help='날짜별 하위 폴더가 들어 있는 폴더')
+    parser.add_argument('--master', default='master_data.csv', help='상품 마스터 CSV (기본값: master_data.csv)')
+    parser.add_argument('-o', '--output-dir', default='output', help='출력 폴더 (기본값: output)')
+    parser.add_argument('--incremental', action='store_true', help='이미 처리한 주문 행은 상태 저장소의 결과를 다시 씀')
+    parser.add_argument('--state-db', default='order_state.sqlite3', help='증분 처리 상태 저장소 (기본값: order_state.sqlite3)')
+    parser.add_argument('--profile-log', help="단계별 성능 기록(JSON lines)을 덧붙일 파일 ('-'이면 표준 출력)")
+    parser.add_argument('--profile-memory', action='store_true', help='단계별 최대 메모리도 측정 (느려짐)')
+    parser.add_argument('--stream', action='store_true', help='이카운트 파일을 나눠 읽어 처리하는 스트리밍 모드 (대용량 재처리용)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help=f'스트리밍 모드에서 한 번에 처리할 행 수 (기본값: {CHUNK_ROWS:,})')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='동시에 처리할 날짜 수 (기본값: CPU 코어 수)')
+    args = parser.parse_args(argv)
+
+    if not args.input_dir and not (args.smartstore and args.ecount and args.godomall):
+        parser.error('--input-dir 또는 --smartstore/--ecount/--godomall 세 파일을 모두 지정해야 합니다.')
+    if args.stream and args.incremental:
+        parser.error('--stream과 --incremental은 함께 쓸 수 없습니다.')
+    if args.chunk_rows <= 0:
+        parser.error('--chunk-rows는 1 이상이어야 합니다.')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    try:
+        jobs = build_jobs(args)
+    except (OSError, ValueError) as e:
+        logger.error("%s", e)
+        return 2
+
+    # 사이드카 캐시를 미리 만들어 두면 작업 프로세스들은 CSV를 다시 파싱하지 않습니다
+    try:
+        get_master_store(args.master)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("상품 마스터 파일을 읽을 수 없습니다 (%s): %s", args.master, e)
+        return 2
+
+    # 증분 처리 영업일: 날짜 폴더는 폴더 이름(예: 20240501, 2024-05-01), 파일 직접 지정은 오늘
+    state_path = args.state_db if args.incremental else None
+    business_dates = {name: None for name, *_ in jobs}
+    if state_path and args.input_dir:
+        try:
+            business_dates = {name: normalize_business_date(name) for name in business_dates}
+        except ValueError as e:
+            logger.error("증분 처리에는 날짜 이름의 폴더가 필요합니다: %s", e)
+            return 2
+    chunk_rows = args.chunk_rows if args.stream else None
+
+    results = []
+    if len(jobs) == 1 or args.jobs <= 1:
+        for name, paths, output_dir in jobs:
+            results.append(run_day(
+                name, paths, args.master, output_dir, True, state_path, business_dates[name], args.profile_memory, chunk_rows
+            ))
+    else:
+        # 날짜끼리 병렬로 처리하므로, 날짜 안에서 파일 읽기 프로세스 풀은 쓰지 않습니다
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            futures = [pool.submit(
+                run_day, name, paths, args.master, output_dir, False, state_path, business_dates[name], args.profile_memory, chunk_rows
+            ) for name, paths, output_dir in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    results.sort(key=lambda result: result[0])
+    if args.profile_log:
+        profile_lines = ''.join(lines for *_, lines in results)
+        if args.profile_log == '-':
+            sys.stdout.write(profile_lines)
+        else:
+            with open(args.profile_log, 'a', encoding='utf-8') as f:
+                f.write(profile_lines)
+
+    failed = 0
+    for name, success, message, _ in results:
+        if success:
+            logger.info("[%s] %s", name, message)
+        else:
+            failed += 1
+            logger.error("[%s] %s", name, message)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
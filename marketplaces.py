@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# 쇼핑몰 어댑터 (금액 보정 가격표)
+# --------------------------------------------------------------------------
+# 쇼핑몰 주문 파일마다 병합 키 열, 같은 의미의 다른 열 이름(별칭), 숫자로 바꿀 금액 열, 보정 금액 계산식을
+# 선언해 둡니다. 파일 읽기(읽을 열, 열 타입), 전처리, 금액 보정, 보정 실패 검증이 모두 이 선언에서 나옵니다.
+# 새 쇼핑몰을 보정 대상에 넣으려면 어댑터를 ADAPTERS에 등록하고 업로드 슬롯을 추가하면 됩니다.
+
+# 이카운트 주문 행의 병합 키 (가격표의 어느 열과 맞출지는 어댑터의 key_columns가 정합니다)
+ORDER_KEY_COLUMNS = ['재고관리코드', '수령자명', '주문수량']
+
+
+class MallAdapter:
+    """쇼핑몰 주문 파일 하나를 금액 보정 가격표로 쓰기 위한 선언.
+
+    mall: 이카운트 쇼핑몰 열의 값. 이 값의 주문 행만 보정합니다.
+    correction_column: 주문 행에 붙는 보정 금액 열 이름
+    key_columns: {이카운트 키 열: 이 파일의 열 이름} (ORDER_KEY_COLUMNS 순서)
+    amount: 전처리된 파일 데이터프레임 → 행별 보정 금액 Series
+    aliases: {다른 열 이름: 표준 열 이름}. 표준 열이 없을 때만 이름을 바꿉니다.
+    numeric_columns: '원', ',' 를 지우고 숫자로 바꿀 열 (빈 값은 0)
+    extra_columns: 보정 외에 검증 등에서 쓰는 열
+    dtypes: {열: 타입} 파일을 읽은 직후 적용할 타입 (ingest.SLOT_DTYPES)
+    """
+
+    def __init__(self, mall, correction_column, key_columns, amount, aliases=None, numeric_columns=(), extra_columns=(), dtypes=None):
+        self.mall = mall
+        self.correction_column = correction_column
+        self.key_columns = key_columns
+        self.amount = amount
+        self.aliases = aliases or {}
+        self.numeric_columns = list(numeric_columns)
+        self.extra_columns = list(extra_columns)
+        self.dtypes = dtypes or {}
+
+    @property
+    def read_columns(self):
+        """파일에서 읽어야 하는 열 (별칭 포함)."""
+        columns = [*self.key_columns.values(), *self.numeric_columns, *self.extra_columns, *self.aliases]
+        return list(dict.fromkeys(columns))
+
+    @property
+    def required_columns(self):
+        """파일에 꼭 있어야 하는 열 (표준 이름. 별칭으로 있어도 됩니다)."""
+        return list(dict.fromkeys([*self.key_columns.values(), *self.numeric_columns, *self.extra_columns]))
+
+    def prepare(self, df):
+        """열 이름 통일, 금액 숫자 변환 후 correction_column을 계산해 붙입니다."""
+        renames = {alias: name for alias, name in self.aliases.items() if alias in df.columns and name not in df.columns}
+        if renames:
+            df = df.rename(columns=renames)
+        for col in self.numeric_columns:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace('[원,]', '', regex=True), errors='coerce').fillna(0)
+        df[self.correction_column] = self.amount(df)
+        return df
+
+    def price_keys(self, df):
+        """전처리된 데이터프레임에서 ORDER_KEY_COLUMNS 순서의 키 열."""
+        return tuple(df[self.key_columns[col]] for col in ORDER_KEY_COLUMNS)
+
+
+def _godomall_amount(df):
+    # 배송비는 수취인의 첫 행에만 더합니다 (배송비 중복 계산 방지)
+    shipping = np.where(df.duplicated(subset=['수취인 이름']), 0, df['총 배송 금액'])
+    return df['상품별 품목금액'] + shipping - df['회원 할인 금액'] - df['쿠폰 할인 금액'] - df['사용된 마일리지']
+
+
+# 업로드 슬롯 이름 → 어댑터 (보정 순서와 검증 순서도 이 순서를 따릅니다)
+ADAPTERS = {
+    'smartstore': MallAdapter(
+        mall='스마트스토어',
+        correction_column='수정될_금액_스토어',
+        key_columns={'재고관리코드': '재고관리코드', '수령자명': '수령자명', '주문수량': '주문수량'},
+        amount=lambda df: df['실결제금액'],
+        extra_columns=['실결제금액'],
+        dtypes={'주문수량': 'int32'},
+    ),
+    'godomall': MallAdapter(
+        mall='고도몰5',
+        correction_column='수정될_금액_고도몰',
+        key_columns={'재고관리코드': '재고관리코드', '수령자명': '수취인 이름', '주문수량': '상품수량'},
+        amount=_godomall_amount,
+        aliases={'자체옵션코드': '재고관리코드', '회 할인 금액': '회원 할인 금액'},
+        numeric_columns=['상품별 품목금액', '총 배송 금액', '회원 할인 금액', '쿠폰 할인 금액', '사용된 마일리지', '총 결제 금액'],
+        dtypes={'상품수량': 'int32'},
+    ),
+}
+
+CORRECTION_COLUMNS = [adapter.correction_column for adapter in ADAPTERS.values()]
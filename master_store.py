@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# --------------------------------------------------------------------------
+# 상품 마스터 저장소
+# --------------------------------------------------------------------------
+# master_data.csv를 프로세스당 한 번만 읽고, SKU코드 해시 인덱스와 열 타입을 미리 만들어 둡니다.
+# 파일의 수정 시각이 바뀌면 내용 해시를 다시 계산해, 내용이 실제로 바뀐 경우에만 다시 읽습니다.
+
+MASTER_COLUMNS = ['과세여부', '입수량']
+
+# 사이드카 캐시: CSV 옆에 Arrow IPC(비압축) 파일로 타입이 적용된 마스터를 저장해 두고,
+# 다음 시작부터는 CSV 파싱 없이 메모리 매핑으로 읽습니다. pandas 열로 바꿀 때(조회용 타입) 복사되므로
+# 작업 프로세스마다 마스터를 따로 들고 있으며, 줄어드는 것은 CSV 파싱 시간입니다.
+# CSV 내용 해시를 스키마 메타데이터에 기록해, CSV가 바뀌면 자동으로 다시 만듭니다.
+SIDECAR_HASH_KEY = b'source_sha256'
+
+
+def _file_digest(file_path):
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _load_master_frame(file_path):
+    """CSV를 읽어 SKU코드 중복을 제거하고 조회용 타입으로 바꿉니다."""
+    df_master = pd.read_csv(file_path, dtype={'SKU코드': str})
+    df_master = df_master.drop_duplicates(subset=['SKU코드'], keep='first')
+    df_master['과세여부'] = df_master['과세여부'].astype('category')
+    df_master['입수량'] = pd.to_numeric(df_master['입수량'], errors='coerce').round().astype('Int64')
+    return df_master.reset_index(drop=True)
+
+
+def sidecar_path(file_path):
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.arrow")
+
+
+def _read_sidecar(path, version):
+    """사이드카가 있고 CSV 해시가 같으면 메모리 매핑으로 읽고, 아니면 None을 돌려줍니다."""
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if (table.schema.metadata or {}).get(SIDECAR_HASH_KEY) != version.encode():
+        return None
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+
+def _write_sidecar(path, df_master, version):
+    """임시 파일에 쓴 뒤 교체해, 다른 프로세스가 덜 쓰인 파일을 읽지 않게 합니다. 실패해도 무시합니다."""
+    if pa is None:
+        return
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df_master, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SIDECAR_HASH_KEY: version.encode()})
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class MasterStore:
+    """SKU코드로 과세여부, 입수량을 조회하는 상품 마스터."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.mtime = os.stat(file_path).st_mtime_ns
+        self.version = _file_digest(file_path)
+        self.df = _read_sidecar(sidecar_path(file_path), self.version)
+        if self.df is None:
+            self.df = _load_master_frame(file_path)
+            _write_sidecar(sidecar_path(file_path), self.df, self.version)
+        self._index = pd.Index(self.df['SKU코드'])
+
+    def __len__(self):
+        return len(self.df)
+
+    def lookup(self, skus, columns=MASTER_COLUMNS):
+        """SKU코드 목록과 같은 순서로 [SKU코드] + columns 표를 돌려줍니다. 없는 SKU는 결측값입니다.
+
+        마스터를 복사하지 않고, 조회 결과 길이만큼의 열만 새로 만듭니다.
+        """
+        positions = self._index.get_indexer(pd.Index(skus))
+        index = skus.index if isinstance(skus, pd.Series) else None
+        return pd.DataFrame(
+            {col: self.df[col].array.take(positions, allow_fill=True) for col in ['SKU코드', *columns]},
+            index=index,
+        )
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_master_store(file_path="master_data.csv"):
+    """file_path의 MasterStore를 돌려줍니다. 파일 내용이 바뀌었으면 다시 읽습니다."""
+    key = os.path.abspath(file_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        mtime = os.stat(file_path).st_mtime_ns
+        if store is None or (store.mtime != mtime and store.version != _file_digest(file_path)):
+            store = MasterStore(file_path)
+            _stores[key] = store
+        elif store.mtime != mtime:
+            # 내용은 같고 수정 시각만 바뀐 경우 (다시 저장, 복사 등)
+            store.mtime = mtime
+        return store
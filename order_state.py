@@ -0,0 +1,140 @@
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from marketplaces import ADAPTERS, CORRECTION_COLUMNS
+
+# --------------------------------------------------------------------------
+# 증분 처리용 주문 상태 저장소 (SQLite)
+# --------------------------------------------------------------------------
+# 하루에 여러 번 실행할 때, 이미 처리한 이카운트 주문 행의 계산 결과(보정 금액, 마스터 조회,
+# 이카운트 행 값)를 저장해 두고 다음 실행에서는 새로 들어왔거나 바뀐 행만 다시 계산합니다.
+#
+# 행 식별: 영업일 + 쇼핑몰 + 재고관리코드 + 수령자명 + 주문수량 + 중복순번
+#   (같은 키의 주문이 여러 줄이면 나타난 순서대로 0, 1, 2 ... 를 붙입니다)
+# 변경 감지: 원래 금액, SKU상품명, 가격표에서 찾은 보정 금액(지문)이 달라졌거나, 상품 마스터 버전이 바뀌면 다시 계산합니다.
+#   나중에 올린 스마트스토어/고도몰 파일에서 금액이 바뀌었거나 새로 찾은 행도 지문이 달라져 다시 계산합니다.
+#   자기 쇼핑몰 가격표에서 금액을 찾지 못했던 행(금액보정 실패)은 저장돼 있어도 매번 다시 계산합니다.
+# 영업일은 YYYYMMDD 문자열로 맞춰 저장합니다 (normalize_business_date).
+# 보관 기간: 영업일이 아니라 행을 저장한 날(저장일) 기준으로 RETENTION_DAYS가 지난 행을 지웁니다.
+#   지난 날짜의 파일을 다시 처리(날짜 폴더 배치 실행)해도 그 날짜의 상태가 바로 지워지지 않습니다.
+
+KEY_COLUMNS = ['쇼핑몰', '재고관리코드', '수령자명', '주문수량', '중복순번']
+# 보정된 실결제금액 외에 주문 행에 새로 붙는 계산 열
+DERIVED_COLUMNS = [
+    *CORRECTION_COLUMNS,
+    'SKU코드', '과세여부', '입수량',
+    '거래처명', '거래유형', '박스', '수량', '공급가액', '부가세',
+]
+CACHED_COLUMNS = ['실결제금액'] + DERIVED_COLUMNS
+# 저장한 지 이 일수가 지난 행은 저장소를 열 때 지웁니다
+RETENTION_DAYS = 7
+# 영업일로 받는 날짜 문자열 형식 (날짜 폴더 이름 등)
+BUSINESS_DATE_FORMATS = ('%Y%m%d', '%Y-%m-%d', '%Y.%m.%d', '%Y_%m_%d')
+
+_COLUMN_TYPES = {
+    '쇼핑몰': 'TEXT', '재고관리코드': 'TEXT', '수령자명': 'TEXT', '주문수량': 'INTEGER', '중복순번': 'INTEGER',
+    **{col: 'REAL' for col in CORRECTION_COLUMNS}, '실결제금액': 'REAL',
+    'SKU코드': 'TEXT', '과세여부': 'TEXT', '입수량': 'INTEGER',
+    '거래처명': 'TEXT', '거래유형': 'INTEGER', '박스': 'REAL', '수량': 'INTEGER', '공급가액': 'REAL', '부가세': 'REAL',
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def normalize_business_date(value):
+    """영업일(YYYYMMDD, YYYY-MM-DD 등의 문자열이나 date)을 YYYYMMDD 문자열로 바꿉니다. 날짜로 읽을 수 없으면 ValueError."""
+    if isinstance(value, date):
+        return value.strftime("%Y%m%d")
+    for date_format in BUSINESS_DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), date_format).strftime("%Y%m%d")
+        except ValueError:
+            pass
+    raise ValueError(f"영업일 '{value}'을(를) 날짜(YYYYMMDD)로 읽을 수 없습니다.")
+
+
+def add_line_keys(df_lines, price_amounts):
+    """이카운트 주문 행에 중복순번과 지문(원래 금액|SKU상품명|가격표별 보정 금액) 열을 붙입니다.
+
+    price_amounts는 AmountCorrector.lookup 결과({보정 금액 열: 행별 금액})입니다.
+    """
+    df_lines['중복순번'] = df_lines.groupby(KEY_COLUMNS[:-1], sort=False).cumcount()
+    parts = [df_lines['실결제금액'], df_lines['SKU상품명']]
+    parts += [pd.Series(price_amounts[column], index=df_lines.index) for column in CORRECTION_COLUMNS]
+    # 결측값은 문자열로 바꿔도 결측값으로 남아 지문 전체가 결측값이 되므로(merge에서 결측값끼리 일치) 빈 문자열로 둡니다
+    fingerprint = parts[0].astype(str).fillna('')
+    for part in parts[1:]:
+        fingerprint = fingerprint + '|' + part.astype(str).fillna('')
+    df_lines['지문'] = fingerprint
+    return df_lines
+
+
+class OrderStateStore:
+    """영업일별로 처리한 주문 행의 계산 결과를 보관합니다. 호출마다 연결을 새로 열어 스레드 간에 안전합니다."""
+
+    def __init__(self, path='order_state.sqlite3', retention_days=RETENTION_DAYS):
+        self.path = path
+        columns = ', '.join(f"{_quote(col)} {_COLUMN_TYPES[col]}" for col in KEY_COLUMNS + CACHED_COLUMNS)
+        key = ', '.join(_quote(col) for col in ['영업일'] + KEY_COLUMNS)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS order_lines ("
+                f"영업일 TEXT, {columns}, 지문 TEXT, 마스터버전 TEXT, 저장일 TEXT, PRIMARY KEY ({key}))"
+            )
+            # 저장일 열이 없던 저장소는 열을 더하고 기존 행은 오늘 저장한 것으로 봅니다
+            if '저장일' not in {row[1] for row in conn.execute("PRAGMA table_info(order_lines)")}:
+                conn.execute("ALTER TABLE order_lines ADD COLUMN 저장일 TEXT")
+                conn.execute("UPDATE order_lines SET 저장일 = ?", (datetime.now().strftime("%Y%m%d"),))
+            cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y%m%d")
+            conn.execute("DELETE FROM order_lines WHERE 저장일 < ?", (cutoff,))
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def match(self, df_lines, business_date, master_version):
+        """저장된 결과를 주문 행에 붙입니다. 반환값: (CACHED_COLUMNS가 채워진 df_lines, 새로 계산할 행 여부)
+
+        df_lines에는 add_line_keys로 만든 중복순번, 지문 열이 있어야 합니다. business_date는 normalize_business_date를 따릅니다.
+        """
+        business_date = normalize_business_date(business_date)
+        with closing(self._connect()) as conn:
+            df_cached = pd.read_sql_query(
+                "SELECT * FROM order_lines WHERE 영업일 = ? AND 마스터버전 = ?",
+                conn, params=(business_date, master_version),
+            ).drop(columns=['영업일', '마스터버전', '저장일'])
+
+        df_cached['주문수량'] = df_cached['주문수량'].astype(df_lines['주문수량'].dtype)
+        df_cached['중복순번'] = df_cached['중복순번'].astype(df_lines['중복순번'].dtype)
+        df_cached = df_cached.rename(columns={'실결제금액': '보정된_실결제금액'})
+        matched = df_lines.merge(df_cached, on=KEY_COLUMNS + ['지문'], how='left', indicator='_cache')
+        is_new = (matched['_cache'] == 'left_only').to_numpy(copy=True)
+        # 금액보정에 실패했던 행은 저장된 결과를 쓰지 않고 다시 계산합니다
+        for adapter in ADAPTERS.values():
+            is_new |= (matched['쇼핑몰'] == adapter.mall).to_numpy(dtype=bool) & matched[adapter.correction_column].isna().to_numpy()
+        matched = matched.drop(columns=['_cache'])
+        if not is_new.all():
+            matched['실결제금액'] = matched['보정된_실결제금액'].where(~is_new, matched['실결제금액'])
+        return matched.drop(columns=['보정된_실결제금액']), is_new
+
+    def save(self, df_rows, business_date, master_version):
+        """새로 계산한 행(KEY_COLUMNS + 지문 + CACHED_COLUMNS)을 저장합니다. 같은 키의 이전 결과는 덮어씁니다."""
+        if df_rows.empty:
+            return
+        business_date = normalize_business_date(business_date)
+        columns = ['영업일'] + KEY_COLUMNS + CACHED_COLUMNS + ['지문', '마스터버전', '저장일']
+        df_save = df_rows[KEY_COLUMNS + CACHED_COLUMNS + ['지문']].astype(object)
+        df_save = df_save.where(df_save.notna(), None)
+        df_save.insert(0, '영업일', business_date)
+        df_save['마스터버전'] = master_version
+        df_save['저장일'] = datetime.now().strftime("%Y%m%d")
+        placeholders = ', '.join('?' for _ in columns)
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO order_lines ({', '.join(_quote(col) for col in columns)}) VALUES ({placeholders})",
+                df_save[columns].itertuples(index=False, name=None),
+            )
@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# 단계별 성능 측정
+# --------------------------------------------------------------------------
+# 처리 단계와 엑셀 내보내기마다 걸린 시간, 행 수, (선택) 최대 메모리를 기록합니다.
+# 앱은 "성능" 패널에 표로 보여 주고, 배치 실행은 JSON lines로 남겨 실행 간 비교에 씁니다.
+
+PROFILE_COLUMNS = ['단계', '시간(초)', '행 수', '최대 메모리(MB)']
+
+# tracemalloc은 프로세스에 하나뿐인데, 백그라운드 작업(jobs.JobRunner)의 프로파일러 여럿이 스레드마다 동시에 잴 수 있습니다.
+# 메모리를 재는 단계가 하나라도 있는 동안 tracemalloc을 켜 두고 마지막 단계가 끝날 때 끕니다.
+# 다른 단계와 겹친 단계는 최대값에 다른 작업의 할당이 섞이므로 최대 메모리를 남기지 않습니다 (None).
+_tracing_lock = threading.Lock()
+# 지금 메모리를 재는 단계: id(기록) → 다른 단계와 겹쳤는지
+_traced_stages = {}
+# tracemalloc을 이 모듈이 켰는지 (바깥에서 켠 경우에는 끄지 않고 최대값도 남기지 않음)
+_owns_tracing = False
+
+
+def _start_tracing(record):
+    global _owns_tracing
+    with _tracing_lock:
+        if not _traced_stages:
+            _owns_tracing = not tracemalloc.is_tracing()
+            if _owns_tracing:
+                tracemalloc.start()
+        overlapped = bool(_traced_stages) or not _owns_tracing
+        for key in _traced_stages:
+            _traced_stages[key] = True
+        _traced_stages[id(record)] = overlapped
+
+
+def _stop_tracing(record):
+    """단계의 최대 메모리(MB). 다른 단계와 겹쳤으면 None."""
+    with _tracing_lock:
+        overlapped = _traced_stages.pop(id(record))
+        peak_mb = None if overlapped else tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        if not _traced_stages and _owns_tracing:
+            tracemalloc.stop()
+        return peak_mb
+
+
+class StageProfiler:
+    """단계별 측정 기록. stage()는 중첩하지 않고 순서대로 씁니다.
+
+    trace_memory=True이면 단계마다 tracemalloc으로 그 단계 안에서 새로 할당된 메모리의 최대값을 잽니다.
+    tracemalloc은 파이썬 객체를 많이 만드는 단계(엑셀 쓰기 등)를 크게 느리게 하고 프로세스 전체에 걸리므로,
+    필요할 때만 켭니다. 메모리를 재는 다른 단계(다른 작업, 중첩된 단계)와 시간이 겹친 단계는 최대 메모리가 None입니다.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """with 블록 하나를 한 단계로 잽니다. 블록 안에서 record['rows']에 결과 행 수를 넣을 수 있습니다."""
+        record = {'stage': name, 'seconds': None, 'rows': rows, 'peak_mb': None, 'parent': None}
+        if self.trace_memory:
+            _start_tracing(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - started
+            if self.trace_memory:
+                record['peak_mb'] = _stop_tracing(record)
+            self.records.append(record)
+
+    def add(self, name, seconds, rows=None, parent=None):
+        """다른 프로세스에서 잰 시간처럼 이미 측정된 값을 기록합니다. parent 단계에 포함된 값이면 합계에서 뺍니다."""
+        self.records.append({'stage': name, 'seconds': seconds, 'rows': rows, 'peak_mb': None, 'parent': parent})
+
+    def wrap(self, name, func, rows=None):
+        """func를 부를 때마다 한 단계로 기록하는 함수를 돌려줍니다 (다운로드 버튼의 지연 생성 등)."""
+        def profiled(*args, **kwargs):
+            with self.stage(name, rows):
+                return func(*args, **kwargs)
+        return profiled
+
+    @property
+    def total_seconds(self):
+        return sum(record['seconds'] for record in self.records if record['parent'] is None)
+
+    def to_frame(self):
+        """기록을 PROFILE_COLUMNS 표로 돌려줍니다."""
+        return pd.DataFrame(
+            [[r['stage'] if r['parent'] is None else f"  └ {r['stage']}", r['seconds'], r['rows'], r['peak_mb']] for r in self.records],
+            columns=PROFILE_COLUMNS,
+        ).astype({'시간(초)': float, '행 수': 'Int64', '최대 메모리(MB)': float})
+
+    def to_json_lines(self, **context):
+        """단계마다 JSON 한 줄. context(실행 이름 등)는 모든 줄에 들어갑니다."""
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        return ''.join(
+            json.dumps({'timestamp': timestamp, **context, **record}, ensure_ascii=False) + '\n'
+            for record in self.records
+        )
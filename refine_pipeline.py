@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from amount_correction import AmountCorrector
+from ecount_rows import compute_ecount_values, layout_ecount_upload
+from ingest import UPLOAD_SLOTS, read_order_files, upload_source
+from marketplaces import ADAPTERS
+from order_state import DERIVED_COLUMNS, add_line_keys
+from profiling import StageProfiler
+from upload_schema import UploadSchemaError, check_uploads
+from validation import build_validation_report, find_godomall_payment_discrepancies
+
+# --------------------------------------------------------------------------
+# 주문 처리 파이프라인
+# --------------------------------------------------------------------------
+# Streamlit에 의존하지 않으므로 앱(data_refine.py)과 배치 실행(main.py) 모두에서 씁니다.
+
+logger = logging.getLogger(__name__)
+
+# process_all_files가 기록하는 최상위 단계 (증분 처리일 때만 있는 '증분 상태 저장'은 빠져 있음)
+PIPELINE_STAGES = (
+    '파일 검사', '파일 읽기', '가격표 전처리', '결제 금액 검증', '주문 행 정리', '금액 보정', '마스터 조회',
+    '이카운트 값 계산', '요약표 생성', '검증 보고서', '이카운트 양식',
+)
+
+
+def prepare_order_lines(df_ecount_orig, start=0):
+    """이카운트 주문 행의 병합 키를 정리합니다. 원래 순서는 original_order(start부터)에 남깁니다.
+
+    수량(int32)과 금액(int64) 타입은 파일을 읽을 때 ingest.SLOT_DTYPES로 이미 맞춰져 있습니다.
+    """
+    df_lines = df_ecount_orig.rename(columns={'금액': '실결제금액'})
+    df_lines['original_order'] = np.arange(start, start + len(df_lines), dtype=np.int32)
+    for col in ['재고관리코드', '수령자명']:
+        df_lines[col] = df_lines[col].astype(str).str.strip()
+    return df_lines
+
+
+def build_packing_list(df_main_result, previous_recipient=None, bundle_offset=0):
+    """original_order 순서의 주문 행으로 포장 리스트를 만듭니다. 수령자가 바뀌는 행마다 묶음번호를 매깁니다.
+
+    묶음 단위로 나눠 만들 때는 앞 묶음의 마지막 수령자명(previous_recipient)과 묶음 수(bundle_offset)를 넘깁니다.
+    """
+    df_packing_list = df_main_result[['SKU상품명', '주문수량', '수령자명', '쇼핑몰']]
+    is_first_item = df_packing_list['수령자명'] != df_packing_list['수령자명'].shift(1, fill_value=previous_recipient)
+    bundle_numbers = (is_first_item.cumsum() + bundle_offset).where(is_first_item, '')
+    return df_packing_list.assign(묶음번호=bundle_numbers)[['묶음번호', 'SKU상품명', '주문수량', '수령자명', '쇼핑몰']]
+
+
+def process_all_files(file1, file2, file3, master, parallel_read=True, state_store=None, business_date=None, profiler=None, publish=None, parsed=None):
+    """세 주문 파일과 상품 마스터로 최종 보정 리스트, 출고수량 요약, 포장 리스트, 이카운트 업로드 데이터를 만듭니다.
+
+    file1~3은 getvalue()가 있는 파일 객체(Streamlit UploadedFile, io.BytesIO)이거나 파일 경로(upload_store.SpilledUpload 포함)입니다.
+    여러 날짜를 프로세스별로 나눠 처리할 때는 parallel_read=False로 파일 읽기 프로세스 풀을 쓰지 않습니다.
+    state_store(OrderStateStore)를 주면 증분 처리: 같은 영업일(business_date, 기본값 오늘)에 이미 처리한
+    주문 행은 저장된 결과를 쓰고, 새로 들어왔거나 바뀐 행만 금액 보정, 마스터 조회, 이카운트 행 계산을 합니다.
+    profiler(StageProfiler)를 주면 단계별 시간, 행 수, 메모리를 기록합니다.
+    parsed({슬롯: ingest.parse_upload 결과})를 주면 업로드 때 미리 읽어 둔 파일은 다시 읽지 않습니다.
+    publish(이름, 데이터프레임)를 주면 결과가 나오는 대로 넘깁니다 (이름: 'payment', 'main', 'quantity_summary',
+    'packing_list', 'issues', 'ecount_upload'). 백그라운드 작업이 끝나기 전에 앱이 먼저 보여 주는 데 씁니다.
+    """
+    profiler = profiler or StageProfiler()
+    publish = publish or (lambda name, df: None)
+    try:
+        # 머리글 행만 읽어 슬롯마다 필요한 열이 있는지 먼저 확인합니다 (파일을 잘못 올렸으면 전체를 읽기 전에 실패)
+        with profiler.stage('파일 검사'):
+            files = dict(zip(UPLOAD_SLOTS, (file1, file2, file3)))
+            parsed_columns = {slot: list(df.columns) for slot, (df, _) in (parsed or {}).items()}
+            check_uploads({slot: None if slot in parsed_columns else upload_source(file) for slot, file in files.items()}, parsed_columns)
+
+        # 세 파일은 서로 독립적이므로 동시에 읽습니다
+        with profiler.stage('파일 읽기') as record:
+            frames, read_timings = read_order_files(file1, file2, file3, parallel=parallel_read, parsed=parsed)
+            frames = dict(zip(UPLOAD_SLOTS, frames))
+            record['rows'] = sum(len(df) for df in frames.values())
+        for slot, elapsed in read_timings.items():
+            profiler.add(f"{slot} (미리 읽음)" if parsed and slot in parsed else slot, elapsed, len(frames[slot]), parent='파일 읽기')
+        df_ecount_orig = frames['ecount']
+
+        # 쇼핑몰 가격표: 어댑터별 열 이름 통일, 금액 숫자 변환, 행별 보정 금액 계산
+        with profiler.stage('가격표 전처리') as record:
+            price_tables = {slot: adapter.prepare(frames[slot]) for slot, adapter in ADAPTERS.items()}
+            corrector = AmountCorrector([(ADAPTERS[slot], df) for slot, df in price_tables.items()])
+            record['rows'] = sum(len(df) for df in price_tables.values())
+
+        # 3단계: 결제 금액 검증 (수취인별 합계를 한 번에 집계)
+        with profiler.stage('결제 금액 검증') as record:
+            df_payment_discrepancies = find_godomall_payment_discrepancies(price_tables['godomall'])
+            record['rows'] = len(df_payment_discrepancies)
+        publish('payment', df_payment_discrepancies)
+
+        # 기존 처리 로직 시작
+        with profiler.stage('주문 행 정리') as record:
+            df_lines = prepare_order_lines(df_ecount_orig)
+            # 읽은 원본은 여기서부터 쓰지 않으므로 놓아 줍니다 (큰 파일에서 최대 메모리를 줄임)
+            del frames, df_ecount_orig, price_tables
+            business_date = business_date or datetime.now().strftime("%Y%m%d")
+            if state_store is not None:
+                # 지문에 가격표에서 찾은 보정 금액을 넣어, 가격표가 바뀐 행은 저장된 결과를 쓰지 않습니다
+                df_lines = add_line_keys(df_lines, corrector.lookup(df_lines))
+                df_lines, is_new = state_store.match(df_lines, business_date, master.version)
+            else:
+                is_new = None
+            record['rows'] = len(df_lines)
+
+        # 새 주문 행만 금액 보정 → 마스터 조회 → 이카운트 행 계산
+        with profiler.stage('금액 보정') as record:
+            if is_new is None or is_new.all():
+                df_new = df_lines.drop(columns=DERIVED_COLUMNS, errors='ignore')
+            else:
+                df_new = df_lines[is_new].drop(columns=DERIVED_COLUMNS, errors='ignore').reset_index(drop=True)
+            df_new = corrector.correct(df_new)
+            del corrector
+            record['rows'] = len(df_new)
+        # 상품 마스터 조회 (SKU코드 인덱스로 과세여부, 입수량을 붙임. 미등록 상품은 SKU코드가 비어 있음)
+        with profiler.stage('마스터 조회', len(df_new)):
+            df_new = pd.concat([df_new, master.lookup(df_new['재고관리코드'])], axis=1)
+        with profiler.stage('이카운트 값 계산', len(df_new)):
+            df_new = pd.concat([df_new, compute_ecount_values(df_new)], axis=1)
+        if state_store is not None:
+            with profiler.stage('증분 상태 저장', len(df_new)):
+                state_store.save(df_new, business_date, master.version)
+                if is_new.all():
+                    df_final = df_new
+                else:
+                    df_final = pd.concat([df_lines[~is_new], df_new], ignore_index=True).sort_values('original_order', ignore_index=True)
+        else:
+            df_final = df_new
+        del df_lines, df_new
+
+        with profiler.stage('요약표 생성', len(df_final)):
+            df_main_result = df_final[['재고관리코드', 'SKU상품명', '주문수량', '실결제금액', '쇼핑몰', '수령자명', 'original_order']]
+
+            df_quantity_summary = df_main_result.groupby('SKU상품명', as_index=False)['주문수량'].sum().rename(columns={'주문수량': '개수'})
+            # df_final은 original_order 순서이므로 다시 정렬하지 않습니다
+            df_packing_list_final = build_packing_list(df_main_result)
+        publish('main', df_main_result.drop(columns=['original_order']))
+        publish('quantity_summary', df_quantity_summary)
+        publish('packing_list', df_packing_list_final)
+
+        # 확인 필요 항목: 금액보정 실패, 고도몰 금액 불일치, 동명이인 의심, 미등록 상품
+        with profiler.stage('검증 보고서') as record:
+            df_issues = build_validation_report(df_final, df_payment_discrepancies, df_main_result, df_final)
+            record['rows'] = len(df_issues)
+        publish('issues', df_issues)
+
+        with profiler.stage('이카운트 양식', len(df_final)):
+            df_ecount_upload = layout_ecount_upload(df_final)
+        publish('ecount_upload', df_ecount_upload)
+
+        return df_main_result.drop(columns=['original_order']), df_quantity_summary, df_packing_list_final, df_ecount_upload, df_payment_discrepancies, True, "모든 파일 처리가 성공적으로 완료되었습니다.", df_issues
+
+    except UploadSchemaError as e:
+        logger.warning("업로드 파일 검사에 실패했습니다: %s", e.problems)
+        return None, None, None, None, None, False, f"업로드 파일을 확인해 주세요.\n\n{e}", None
+
+    except Exception as e:
+        logger.exception("처리 중 심각한 오류가 발생했습니다")
+        return None, None, None, None, None, False, f"처리 중 심각한 오류가 발생했습니다: {e}\n\n오류가 발생했습니다. 파일을 다시 확인하거나 관리자에게 문의하세요.", None
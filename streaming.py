@@ -0,0 +1,200 @@
+import logging
+import pickle
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from amount_correction import AmountCorrector
+from ecount_rows import compute_ecount_values, ecount_sort_keys, layout_ecount_upload
+from excel_export import ExcelStreamWriter
+from ingest import CHUNK_ROWS, UPLOAD_SLOTS, iter_upload_chunks, read_upload, upload_source
+from marketplaces import ADAPTERS
+from profiling import StageProfiler
+from refine_pipeline import build_packing_list, prepare_order_lines
+from upload_schema import UploadSchemaError, check_uploads
+from validation import (
+    assemble_validation_report, combine_order_ranges, find_correction_failures, find_godomall_payment_discrepancies,
+    find_unmastered_products, homonym_issues, payment_discrepancy_issues, recipient_order_ranges,
+)
+
+# --------------------------------------------------------------------------
+# 스트리밍 처리 (월말 일괄 재처리)
+# --------------------------------------------------------------------------
+# 이카운트 파일을 chunk_rows 행씩 읽어, 미리 만든 가격표 인덱스(AmountCorrector)와 상품 마스터로 묶음마다 처리하고
+# 결과 행을 바로 엑셀 파일에 이어 씁니다. 메모리에는 한 묶음과 작은 집계(출고수량, 수령자별 주문 범위,
+# 확인 필요 항목)만 남습니다. original_order와 포장 리스트 묶음번호는 묶음 경계를 넘어 이어집니다.
+#
+# 이카운트 업로드 파일은 거래처, 거래유형 순으로 정렬해야 하므로, 묶음의 행을 (거래처 순위, 거래유형) 그룹별
+# 임시 파일에 모아 두었다가 마지막에 그룹 순서대로 씁니다. 그룹 안에서는 원래 순서가 유지됩니다.
+# 증분 처리(상태 저장소)는 지원하지 않습니다. 하루치 처리는 refine_pipeline.process_all_files를 씁니다.
+
+logger = logging.getLogger(__name__)
+
+# targets 키 (엑셀 내보내기 format_type과 같고, 최종 보정 리스트는 'main')
+STREAM_OUTPUTS = ('ecount_upload', 'packing_list', 'quantity_summary', 'main')
+
+MAIN_COLUMNS = ['재고관리코드', 'SKU상품명', '주문수량', '실결제금액', '쇼핑몰', '수령자명']
+
+
+@contextmanager
+def _timed(timings, name):
+    """묶음마다 반복되는 단계의 시간을 timings[name]에 더합니다."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+class _SpillGroups:
+    """그룹 키별 임시 파일에 데이터프레임 조각을 순서대로 쌓아 두었다가 키 순서대로 돌려줍니다."""
+
+    def __init__(self):
+        self._files = {}
+
+    def append(self, key, df):
+        if key not in self._files:
+            self._files[key] = tempfile.TemporaryFile()
+        pickle.dump(df, self._files[key], protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self):
+        for key in sorted(self._files):
+            spill = self._files[key]
+            spill.seek(0)
+            while True:
+                try:
+                    yield pickle.load(spill)
+                except EOFError:
+                    break
+
+    def close(self):
+        for spill in self._files.values():
+            spill.close()
+        self._files.clear()
+
+
+def stream_all_files(file1, file2, file3, master, targets, chunk_rows=CHUNK_ROWS, profiler=None):
+    """process_all_files와 같은 결과 파일을 이카운트 파일을 chunk_rows 행씩 나눠 처리하며 만듭니다.
+
+    file1~3은 getvalue()가 있는 파일 객체나 파일 경로이고, targets는 {STREAM_OUTPUTS 키: 저장할 경로 또는 파일 객체}입니다.
+    스마트스토어, 고도몰 파일은 가격표 인덱스를 만들기 위해 한 번에 읽습니다.
+    열 너비는 첫 묶음으로 정합니다 (to_excel_formatted가 표본 행으로 추정하는 것과 같은 방식).
+    반환값: (주문 행 수, 출고수량 요약, 고도몰 결제 금액 불일치, 성공 여부, 메시지, 확인 필요 항목)
+    """
+    profiler = profiler or StageProfiler()
+    spill = _SpillGroups()
+    try:
+        with profiler.stage('파일 검사'):
+            check_uploads({slot: upload_source(file) for slot, file in zip(UPLOAD_SLOTS, (file1, file2, file3))})
+
+        with profiler.stage('가격표 전처리') as record:
+            uploads = {'smartstore': file1, 'godomall': file3}
+            price_tables = {slot: adapter.prepare(read_upload(upload_source(uploads[slot]), slot)) for slot, adapter in ADAPTERS.items()}
+            corrector = AmountCorrector([(ADAPTERS[slot], df) for slot, df in price_tables.items()])
+            record['rows'] = sum(len(df) for df in price_tables.values())
+
+        with profiler.stage('결제 금액 검증') as record:
+            df_payment_discrepancies = find_godomall_payment_discrepancies(price_tables['godomall'])
+            record['rows'] = len(df_payment_discrepancies)
+        del price_tables
+
+        writers = {name: ExcelStreamWriter(None if name == 'main' else name) for name in STREAM_OUTPUTS}
+        timings = {}
+        n_lines, previous_recipient, bundle_offset = 0, None, 0
+        quantity_totals, order_ranges, failures, unmastered = None, None, [], []
+        df_upload_sample = None
+
+        with profiler.stage('주문 묶음 처리') as record:
+            chunks = iter_upload_chunks(upload_source(file2), 'ecount', chunk_rows)
+            while True:
+                with _timed(timings, '파일 읽기'):
+                    df_chunk = next(chunks, None)
+                if df_chunk is None:
+                    break
+                with _timed(timings, '금액 보정'):
+                    df_lines = corrector.correct(prepare_order_lines(df_chunk, start=n_lines))
+                del df_chunk
+                with _timed(timings, '마스터 조회'):
+                    df_lines = pd.concat([df_lines, master.lookup(df_lines['재고관리코드'])], axis=1)
+                with _timed(timings, '이카운트 값 계산'):
+                    df_lines = pd.concat([df_lines, compute_ecount_values(df_lines)], axis=1)
+
+                with _timed(timings, '요약, 검증 집계'):
+                    df_main_result = df_lines[MAIN_COLUMNS + ['original_order']]
+                    df_packing_list = build_packing_list(df_main_result, previous_recipient, bundle_offset)
+                    if len(df_main_result):
+                        previous_recipient = df_main_result['수령자명'].iloc[-1]
+                    bundle_offset += int((df_packing_list['묶음번호'] != '').sum())
+
+                    quantities = df_main_result.groupby('SKU상품명')['주문수량'].sum()
+                    quantities.index = quantities.index.astype(str)
+                    quantity_totals = quantities if quantity_totals is None else pd.concat([quantity_totals, quantities]).groupby(level=0).sum()
+                    ranges = recipient_order_ranges(df_main_result)
+                    order_ranges = ranges if order_ranges is None else combine_order_ranges([order_ranges, ranges])
+                    failures.append(find_correction_failures(df_lines))
+                    unmastered.append(find_unmastered_products(df_lines))
+
+                with _timed(timings, '엑셀 쓰기'):
+                    writers['main'].write(df_main_result[MAIN_COLUMNS])
+                    writers['packing_list'].write(df_packing_list)
+
+                # 이카운트 업로드 행은 정렬 그룹별로 임시 파일에 모아 둡니다
+                with _timed(timings, '이카운트 양식'):
+                    df_upload = layout_ecount_upload(df_lines)
+                    if df_upload_sample is None:
+                        df_upload_sample = writers['ecount_upload'].width_sample = df_upload
+                    client_rank, transaction_types = ecount_sort_keys(df_upload)
+                    for (rank, transaction_type), piece in df_upload.groupby([client_rank, transaction_types], sort=False):
+                        spill.append((int(rank), int(transaction_type)), piece)
+
+                n_lines += len(df_lines)
+                del df_lines, df_main_result, df_packing_list, df_upload
+            record['rows'] = n_lines
+        for name, seconds in timings.items():
+            profiler.add(name, seconds, parent='주문 묶음 처리')
+
+        with profiler.stage('이카운트 양식 쓰기', n_lines):
+            writer = writers['ecount_upload']
+            for piece in spill:
+                writer.write(piece)
+            if writer.n_rows == 0:
+                writer.write(df_upload_sample.iloc[:0])
+            df_upload_sample = None
+
+        with profiler.stage('요약표 생성') as record:
+            df_quantity_summary = (
+                quantity_totals.rename_axis('SKU상품명').reset_index(name='개수') if quantity_totals is not None
+                else pd.DataFrame(columns=['SKU상품명', '개수'])
+            )
+            writers['quantity_summary'].write(df_quantity_summary)
+            record['rows'] = len(df_quantity_summary)
+
+        # 확인 필요 항목: 금액보정 실패, 고도몰 금액 불일치, 동명이인 의심, 미등록 상품
+        with profiler.stage('검증 보고서') as record:
+            df_issues = assemble_validation_report([
+                *failures,
+                payment_discrepancy_issues(df_payment_discrepancies),
+                homonym_issues(order_ranges),
+                *unmastered,
+            ])
+            record['rows'] = len(df_issues)
+
+        with profiler.stage('파일 저장', n_lines):
+            for name, writer in writers.items():
+                writer.close(targets[name])
+
+        message = f"모든 파일 처리가 성공적으로 완료되었습니다. (주문 {n_lines:,}행, {chunk_rows:,}행씩 처리)"
+        return n_lines, df_quantity_summary, df_payment_discrepancies, True, message, df_issues
+
+    except UploadSchemaError as e:
+        logger.warning("업로드 파일 검사에 실패했습니다: %s", e.problems)
+        return 0, None, None, False, f"업로드 파일을 확인해 주세요.\n\n{e}", None
+
+    except Exception as e:
+        logger.exception("스트리밍 처리 중 심각한 오류가 발생했습니다")
+        return 0, None, None, False, f"처리 중 심각한 오류가 발생했습니다: {e}\n\n오류가 발생했습니다. 파일을 다시 확인하거나 관리자에게 문의하세요.", None
+
+    finally:
+        spill.close()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# --------------------------------------------------------------------------
+# 읽은 업로드 파일 디스크 캐시
+# --------------------------------------------------------------------------
+# 같은 파일을 다시 올리면(마스터 수정 후 재실행, 다른 사람의 재확인 등) 엑셀을 다시 파싱하지 않도록,
+# 파일 bytes의 SHA-256으로 열 선택과 타입 적용까지 끝난 데이터프레임을 Arrow IPC(비압축) 파일로 저장해 두고
+# 메모리 매핑으로 읽습니다. 파일 이름에 슬롯과 읽기 설정(열, 타입)의 지문이 들어가므로 설정이 바뀌면 새로 만듭니다.
+#
+# 여러 Streamlit 작업 프로세스가 같은 디렉터리를 함께 씁니다. 임시 파일에 쓴 뒤 교체하므로 덜 쓰인 파일을
+# 읽지 않고, 읽을 때 수정 시각을 갱신해 총 크기가 상한을 넘으면 가장 오래 쓰지 않은 파일부터 지웁니다.
+# 캐시 디렉터리는 환경 변수 UPLOAD_CACHE_DIR로 바꿀 수 있고, 빈 값이면 캐시를 쓰지 않습니다.
+
+UPLOAD_CACHE_DIR_ENV = 'UPLOAD_CACHE_DIR'
+DEFAULT_UPLOAD_CACHE_DIR = '.upload_cache'
+UPLOAD_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+CACHE_SUFFIX = '.arrow'
+
+
+def _mixed_object(values):
+    return pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty')
+
+
+def cache_dir():
+    """캐시 디렉터리. 캐시를 쓰지 않으면(pyarrow 없음, 환경 변수가 빈 값) None."""
+    if pa is None:
+        return None
+    return os.environ.get(UPLOAD_CACHE_DIR_ENV, DEFAULT_UPLOAD_CACHE_DIR) or None
+
+
+def cache_key(digest, slot, settings):
+    """캐시 파일 이름: 슬롯, 파일 내용 해시(digest, SHA-256 hex), 읽기 설정(settings, JSON으로 바꿀 수 있는 값) 지문."""
+    fingerprint = hashlib.sha256(json.dumps(settings, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return f"{slot}-{digest}-{fingerprint}{CACHE_SUFFIX}"
+
+
+def load(key):
+    """캐시에 있으면 데이터프레임, 없으면 None. 읽은 파일은 가장 최근에 쓴 것으로 표시합니다."""
+    directory = cache_dir()
+    if directory is None:
+        return None
+    path = os.path.join(directory, key)
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        os.utime(path)
+    except (OSError, pa.ArrowInvalid):
+        # 없거나, 다른 프로세스가 방금 지웠거나, 깨진 파일
+        return None
+    df = table.to_pandas()
+    # 문자열 object 열(pandas 3 미만)의 빈 값은 읽기 함수처럼 NaN으로 둡니다 (Arrow에서는 None으로 돌아올 수 있음)
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def store(key, df, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+    """데이터프레임을 캐시에 씁니다. 쓰기에 실패해도(읽기 전용 디렉터리, 디스크 부족 등) 무시합니다."""
+    directory = cache_dir()
+    # 값이 섞인 object 열은 Arrow를 거치면 타입이 바뀔 수 있으므로(정수와 문자열, 정수와 None → 실수 등) 캐시하지 않습니다.
+    # 문자열만 든 object 열(pandas 3 미만의 문자열 열)은 그대로 돌아오므로 캐시합니다
+    if directory is None or any(_mixed_object(df[col]) for col in df.columns[df.dtypes == object]):
+        return
+    path = os.path.join(directory, key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    evict(directory, max_bytes)
+
+
+def evict(directory, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+    """총 크기가 max_bytes 이하가 될 때까지 가장 오래 쓰지 않은(수정 시각이 오래된) 캐시 파일부터 지웁니다."""
+    entries = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # 다른 프로세스가 먼저 지웠거나 (윈도우에서) 아직 읽는 중인 파일
+            pass
+        total -= size
@@ -0,0 +1,76 @@
+from ingest import SLOT_COLUMNS, UPLOAD_SLOTS, read_header
+from marketplaces import ADAPTERS
+
+# --------------------------------------------------------------------------
+# 업로드 파일 검사 (머리글 행)
+# --------------------------------------------------------------------------
+# 파일 전체를 읽기 전에 머리글 행(ingest.read_header)만 읽어 슬롯마다 필요한 열이 있는지 확인합니다.
+# 고도몰 파일을 스마트스토어 자리에 올리는 등 파일을 잘못 넣으면 세 파일을 모두 파싱한 뒤 병합 중에
+# KeyError로 실패하는 대신, 몇 밀리초 안에 어느 파일이 무엇으로 보이는지 알려 줍니다.
+# 쇼핑몰 파일의 필요한 열과 별칭(회 할인 금액 → 회원 할인 금액 등)은 어댑터(marketplaces.ADAPTERS) 선언을 따릅니다.
+
+SLOT_LABELS = {'smartstore': '스마트스토어', 'ecount': '이카운트', 'godomall': '고도몰'}
+
+# 슬롯 → 꼭 있어야 하는 열 (표준 이름)
+REQUIRED_COLUMNS = {
+    'ecount': SLOT_COLUMNS['ecount'],
+    **{slot: adapter.required_columns for slot, adapter in ADAPTERS.items()},
+}
+
+# 슬롯 → {별칭: 표준 열 이름}
+COLUMN_ALIASES = {slot: ADAPTERS[slot].aliases if slot in ADAPTERS else {} for slot in UPLOAD_SLOTS}
+
+
+class UploadSchemaError(ValueError):
+    """업로드 파일이 슬롯에 맞지 않을 때. problems는 {슬롯: 설명 문장}입니다."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__('\n'.join(f"- {problem}" for problem in problems.values()))
+
+
+def missing_columns(columns, slot):
+    """slot 파일에 필요한데 columns(열 이름 목록)에 없는 열 (별칭으로 있는 열은 있는 것으로 봅니다)."""
+    aliases = COLUMN_ALIASES.get(slot, {})
+    present = {aliases.get(col, col) for col in columns}
+    return [col for col in REQUIRED_COLUMNS[slot] if col not in present]
+
+
+def detect_slots(columns):
+    """columns를 가진 파일로 볼 수 있는 슬롯 목록 (필요한 열이 모두 있는 슬롯, UPLOAD_SLOTS 순서)."""
+    return [slot for slot in UPLOAD_SLOTS if not missing_columns(columns, slot)]
+
+
+def header_problem(columns, slot):
+    """columns가 slot 파일에 맞으면 None, 아니면 사용자에게 보여 줄 설명 문장."""
+    missing = missing_columns(columns, slot)
+    if not missing:
+        return None
+    others = [SLOT_LABELS[other] for other in detect_slots(columns) if other != slot]
+    if others:
+        return f"'{SLOT_LABELS[slot]}' 자리의 파일이 {'/'.join(others)} 파일로 보입니다. 파일을 맞는 자리에 올려 주세요."
+    return f"'{SLOT_LABELS[slot]}' 파일에 필요한 열이 없습니다: {', '.join(missing)}"
+
+
+def upload_problem(data, slot):
+    """업로드 파일(data: bytes 또는 경로)의 머리글만 읽어 검사합니다. 맞으면 None, 아니면 설명 문장."""
+    try:
+        columns = read_header(data)
+    except Exception as e:
+        return f"'{SLOT_LABELS[slot]}' 파일을 읽을 수 없습니다: {e}"
+    return header_problem(columns, slot)
+
+
+def check_uploads(uploads, columns=None):
+    """{슬롯: 업로드 data}의 머리글을 검사합니다. 문제가 있으면 UploadSchemaError.
+
+    columns({슬롯: 열 이름 목록})에 있는 슬롯은 파일을 다시 읽지 않고 그 열 이름으로 검사합니다 (미리 읽은 파일).
+    """
+    columns = columns or {}
+    problems = {}
+    for slot, data in uploads.items():
+        problem = header_problem(columns[slot], slot) if slot in columns else upload_problem(data, slot)
+        if problem:
+            problems[slot] = problem
+    if problems:
+        raise UploadSchemaError(problems)
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import tempfile
+import weakref
+
+from ingest import detect_file_format
+
+# --------------------------------------------------------------------------
+# 업로드 파일 디스크 보관
+# --------------------------------------------------------------------------
+# 업로드 파일을 SPILL_CHUNK_BYTES씩 임시 파일에 옮겨 쓰면서 내용 해시를 함께 계산합니다. 이후 해시, 미리 읽기,
+# 처리 작업은 업로드 객체(bytes) 대신 이 파일 경로를 씁니다. 읽기 함수는 경로에서 직접 읽고(CSV는 메모리 매핑),
+# 읽기 프로세스에도 bytes 대신 경로만 넘기며, 보관된 작업 결과가 업로드 bytes를 붙잡고 있지 않습니다.
+# 임시 파일은 SpilledUpload 객체가 더 이상 쓰이지 않으면(세션에서 파일을 바꾸고, 그 파일을 쓰는 작업도 끝나면) 지워집니다.
+#
+# 메모리 예산: 파일을 읽고 처리하는 동안 드는 메모리를 파일 형식별 배수(MEMORY_FACTORS)로 추정합니다.
+# 세션마다 업로드 파일의 추정 메모리 합이 예산을 넘으면 처리하지 않고, 미리 읽기와 처리 작업은 서버 전체 예산
+# 하나(jobs.MemoryBudget) 안에서만 동시에 실행합니다.
+
+SPILL_CHUNK_BYTES = 1024 * 1024
+
+# 업로드 크기 대비 읽기 + 처리 중 최대 메모리 증가 배수. 합성 주문 파일(10만~100만 행)로 잰 값은
+# xlsx 약 24배(압축된 XML), csv 약 2.3~2.8배이며 여유를 조금 둡니다. xls는 잰 자료가 없어 어림값입니다
+MEMORY_FACTORS = {'xlsx': 25, 'xls': 8, 'csv': 4}
+# 미리 읽은 데이터프레임에서 처리를 시작할 때, 데이터프레임 외에 처리 중 더 드는 메모리의 업로드 크기 대비 배수.
+# 같은 합성 파일로 잰 값은 csv 1.2~2.7배, xlsx 약 3배(10만 행)이며 작은 파일일수록 큽니다
+PIPELINE_MEMORY_FACTORS = {'xlsx': 4, 'xls': 4, 'csv': 3}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SpilledUpload(os.PathLike):
+    """임시 파일로 옮긴 업로드 파일. 경로가 필요한 곳(pandas 읽기 함수, open)에 그대로 넘길 수 있습니다."""
+
+    def __init__(self, path, name, size, sha256, file_format):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.sha256 = sha256
+        self.file_format = file_format
+        self._finalizer = weakref.finalize(self, _remove, path)
+
+    def __fspath__(self):
+        return self.path
+
+    def __reduce__(self):
+        # 다른 프로세스(파일 읽기 프로세스 풀)에는 경로 문자열만 넘깁니다. 그쪽에서 임시 파일을 지우지 않도록
+        return str, (self.path,)
+
+    @property
+    def estimated_memory(self):
+        """이 파일을 읽고 처리하는 동안 드는 메모리 추정값(바이트)."""
+        return self.size * MEMORY_FACTORS[self.file_format]
+
+    @property
+    def pipeline_memory(self):
+        """미리 읽어 둔 이 파일의 데이터프레임으로 처리할 때 데이터프레임 외에 더 드는 메모리 추정값(바이트)."""
+        return self.size * PIPELINE_MEMORY_FACTORS[self.file_format]
+
+    def close(self):
+        """임시 파일을 바로 지웁니다."""
+        self._finalizer()
+
+
+def spill_upload(uploaded_file, directory=None, chunk_bytes=SPILL_CHUNK_BYTES):
+    """업로드 파일 객체를 임시 파일로 옮겨 SpilledUpload를 돌려줍니다. 파일 객체의 읽기 위치는 처음으로 돌려 둡니다."""
+    hasher = hashlib.sha256()
+    header = b''
+    fd, path = tempfile.mkstemp(prefix='upload-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as spill:
+            uploaded_file.seek(0)
+            for block in iter(lambda: uploaded_file.read(chunk_bytes), b''):
+                header = header or block[:8]
+                hasher.update(block)
+                spill.write(block)
+    except BaseException:
+        _remove(path)
+        raise
+    finally:
+        uploaded_file.seek(0)
+    return SpilledUpload(path, getattr(uploaded_file, 'name', None), os.path.getsize(path), hasher.hexdigest(), detect_file_format(header))
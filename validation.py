@@ -0,0 +1,108 @@
+import pandas as pd
+
+from marketplaces import ADAPTERS
+
+# --------------------------------------------------------------------------
+# 데이터 검증
+# --------------------------------------------------------------------------
+
+# 고도몰 계산 금액과 실제 결제 금액의 허용 오차(원)
+PAYMENT_TOLERANCE = 1
+
+
+def find_godomall_payment_discrepancies(df_godomall, tolerance=PAYMENT_TOLERANCE):
+    """수취인별 계산 금액 합계와 실제 결제 금액을 비교해 허용 오차를 넘는 주문만 돌려줍니다.
+
+    반환 열: 수취인 이름, 계산금액, 실제금액, 차이 (차이 = 계산금액 - 실제금액)
+    실제 결제 금액은 주문 단위로 반복 기재되므로 수취인별 첫 행 값을 씁니다.
+    """
+    summary = df_godomall.groupby('수취인 이름', sort=True).agg(
+        계산금액=('수정될_금액_고도몰', 'sum'),
+        실제금액=('총 결제 금액', 'first'),
+    ).reset_index()
+    summary['차이'] = summary['계산금액'] - summary['실제금액']
+    return summary[summary['차이'].abs() > tolerance].reset_index(drop=True)
+
+
+# --------------------------------------------------------------------------
+# 검증 보고서 (확인 필요 항목)
+# --------------------------------------------------------------------------
+# 경고를 행마다 문자열로 만드는 대신, 항목별로 마스크를 한 번에 계산해 하나의 표로 모읍니다.
+
+ISSUE_CATEGORIES = ['금액보정 실패', '고도몰 금액 불일치', '동명이인 의심', '미등록 상품']
+ISSUE_COLUMNS = ['구분', '쇼핑몰', '수령자명', '재고관리코드', '내용']
+
+
+def _issues(category, mall, recipient, sku, detail):
+    """같은 길이의 열(또는 스칼라)로 한 구분의 항목 표를 만듭니다."""
+    return pd.DataFrame({'구분': category, '쇼핑몰': mall, '수령자명': recipient, '재고관리코드': sku, '내용': detail})
+
+
+def _format_won(values):
+    # 빈 Series도 문자열 dtype이 되도록 astype(str)을 거칩니다 (문자열 결합 오류 방지)
+    return values.map('{:,.0f}원'.format).astype(str)
+
+
+def find_correction_failures(df_final):
+    """보정 대상 쇼핑몰(ADAPTERS) 주문 중 금액 보정 값을 찾지 못한 행."""
+    is_failed = pd.Series(False, index=df_final.index)
+    for adapter in ADAPTERS.values():
+        is_failed |= (df_final['쇼핑몰'] == adapter.mall) & df_final[adapter.correction_column].isna()
+    failed = df_final[is_failed]
+    return _issues('금액보정 실패', failed['쇼핑몰'], failed['수령자명'], failed['재고관리코드'], failed['SKU상품명'])
+
+
+def payment_discrepancy_issues(df_discrepancies):
+    detail = (
+        '차이 ' + _format_won(df_discrepancies['차이'])
+        + ' (계산값: ' + _format_won(df_discrepancies['계산금액'])
+        + ', 실제값: ' + _format_won(df_discrepancies['실제금액']) + ')'
+    )
+    return _issues('고도몰 금액 불일치', '고도몰5', df_discrepancies['수취인 이름'], '', detail)
+
+
+def recipient_order_ranges(df_main_result):
+    """수령자명별 original_order의 min, max, count. 나눠 읽은 주문 행은 combine_order_ranges로 합칩니다."""
+    return df_main_result.groupby('수령자명', sort=True)['original_order'].agg(['min', 'max', 'count'])
+
+
+def combine_order_ranges(ranges):
+    """recipient_order_ranges 결과 여러 개를 하나로 합칩니다."""
+    return pd.concat(ranges).groupby(level=0, sort=True).agg({'min': 'min', 'max': 'max', 'count': 'sum'})
+
+
+def homonym_issues(orders):
+    """같은 수령자명의 주문이 연속되지 않고 떨어져 있으면 동명이인으로 의심합니다. orders는 recipient_order_ranges 결과입니다."""
+    suspects = orders[(orders['count'] > 1) & (orders['max'] - orders['min'] + 1 != orders['count'])]
+    return _issues('동명이인 의심', '', suspects.index.to_series(), '', '주문이 떨어져서 입력되었습니다')
+
+
+def find_homonym_suspects(df_main_result):
+    return homonym_issues(recipient_order_ranges(df_main_result))
+
+
+def find_unmastered_products(df_merged):
+    """상품 마스터에 없는 재고관리코드."""
+    unmastered = df_merged[df_merged['SKU코드'].isna()]
+    return _issues('미등록 상품', unmastered['쇼핑몰'], unmastered['수령자명'], unmastered['재고관리코드'], unmastered['SKU상품명'])
+
+
+def build_validation_report(df_final, df_payment_discrepancies, df_main_result, df_merged):
+    """모든 확인 필요 항목을 구분 순서대로 하나의 표(ISSUE_COLUMNS)로 모읍니다."""
+    return assemble_validation_report([
+        find_correction_failures(df_final),
+        payment_discrepancy_issues(df_payment_discrepancies),
+        find_homonym_suspects(df_main_result),
+        find_unmastered_products(df_merged),
+    ])
+
+
+def assemble_validation_report(issue_frames):
+    """구분 순서대로 모은 항목 표 목록을 하나의 표(ISSUE_COLUMNS)로 합칩니다."""
+    report = pd.concat(issue_frames, ignore_index=True)
+    report = report[ISSUE_COLUMNS].copy()
+    # 범주형 열이 섞여 있을 수 있으므로 문자열로 바꾼 뒤 빈 값을 채웁니다
+    for col in ISSUE_COLUMNS[1:]:
+        report[col] = report[col].astype(str).fillna('')
+    report['구분'] = pd.Categorical(report['구분'], categories=ISSUE_CATEGORIES)
+    return report